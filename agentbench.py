@@ -0,0 +1,282 @@
+"""
+Latency benchmark for the analyze_property and plan_trip orchestrators.
+
+Drives both orchestrators against the local stand-in backend (fakemaps.py) at
+several concurrency levels and reports p50/p95/p99 latency per agent method and
+end to end, throughput, cache hit ratios and upstream call counts as JSON:
+
+    python agentbench.py --concurrency 1 4 16 --requests 200 --output bench.json
+    python agentbench.py --baseline bench.json --output bench_new.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# The agents read their configuration when they are created, so point them at
+# a throwaway geocode cache and a googlemaps-compatible fake key up front.
+os.environ.setdefault("GEOCODE_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "bench_geocode.sqlite3"))
+os.environ.setdefault("GOOGLE_MAPS_API_KEY", "AIzaFakeBenchmarkKey")
+
+import realestate
+import travel
+from agentcache import default_geocode_cache, default_places_cache, default_weather_cache
+from fakemaps import FakeBackendConfig, start_fake_server
+from ratelimit import configure_default_rate_limiter
+from singleflight import default_single_flight
+from tracing import RingBufferExporter, get_exporter, set_exporter
+
+
+def percentiles(values):
+    """
+    Summarizes a list of latencies in seconds.
+
+    Returns:
+        dict: count, mean, p50, p95, p99 and max, in milliseconds.
+    """
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(q):
+        return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) * 1000,
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+def summarize_spans(spans):
+    """
+    Groups agent spans by 'agent.method'.
+
+    Returns:
+        dict: For each agent method, its latency percentiles plus outcome and
+        cache status counts.
+    """
+    grouped = defaultdict(list)
+    for span in spans:
+        grouped[f"{span.agent}.{span.method}"].append(span)
+
+    summary = {}
+    for name, group in grouped.items():
+        stats = percentiles([span.duration for span in group])
+        stats["outcomes"] = dict(Counter(span.outcome for span in group))
+        stats["cache"] = dict(Counter(span.cache for span in group if span.cache))
+        summary[name] = stats
+    return summary
+
+
+def _workload(orchestrator, requests, unique):
+    """
+    Builds the list of orchestrator calls for one run. Inputs repeat once
+    `unique` distinct ones have been used, so caches see realistic reuse.
+    """
+    if orchestrator == "analyze_property":
+        inputs = [f"{100 + i} Castro St, Mountain View, CA" for i in range(unique)]
+        call = realestate.analyze_property
+    else:
+        inputs = [f"Bench City {i}" for i in range(unique)]
+        call = lambda city: asyncio.run(travel.plan_trip_async(city))
+    return [functools.partial(call, inputs[i % unique]) for i in range(requests)]
+
+
+def _reset_state(server):
+    default_geocode_cache().clear()
+    default_places_cache().clear()
+    default_weather_cache().clear()
+    server.reset_stats()
+
+
+def _cache_stats(flights_before):
+    flights = default_single_flight().stats()
+    calls = flights["calls"] - flights_before["calls"]
+    shared = flights["shared"] - flights_before["shared"]
+    return {
+        "geocode": default_geocode_cache().stats(),
+        "places": default_places_cache().stats(),
+        "weather": default_weather_cache().stats(),
+        "single_flight": {
+            "calls": calls,
+            "shared": shared,
+            "coalesced_ratio": shared / (calls + shared) if calls + shared else 0.0,
+        },
+    }
+
+
+def run_level(server, exporter, orchestrator, concurrency, requests, unique):
+    """
+    Runs `requests` orchestrator calls with `concurrency` of them in flight.
+
+    Returns:
+        dict: The measurements for this orchestrator and concurrency level.
+    """
+    _reset_state(server)
+    exporter.clear()
+    flights_before = default_single_flight().stats()
+    calls = _workload(orchestrator, requests, unique)
+    latencies = []
+    lock = threading.Lock()
+
+    def run(call):
+        started = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    # The orchestrators print their results; keep that out of the measurements.
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(run, calls))
+    elapsed = time.perf_counter() - started
+
+    upstream = server.stats()
+    return {
+        "orchestrator": orchestrator,
+        "concurrency": concurrency,
+        "requests": requests,
+        "seconds": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "end_to_end": percentiles(latencies),
+        "agents": summarize_spans(exporter.spans()),
+        "cache": _cache_stats(flights_before),
+        "upstream_calls": {endpoint: counts.get("requests", 0) for endpoint, counts in upstream.items()},
+        "upstream_failures": {
+            endpoint: {k: v for k, v in counts.items() if k != "requests"}
+            for endpoint, counts in upstream.items()
+        },
+    }
+
+
+def run_benchmark(concurrency_levels=(1, 4, 16), requests=100, unique=25,
+                  orchestrators=("analyze_property", "plan_trip"), backend=None, qps=None):
+    """
+    Benchmarks the orchestrators against a freshly started fake backend.
+
+    Args:
+        concurrency_levels (iterable): Numbers of orchestrator calls in flight.
+        requests (int): Orchestrator calls per level.
+        unique (int): Distinct addresses / cities in the workload.
+        orchestrators (iterable): Which orchestrators to drive.
+        backend (FakeBackendConfig): Fake backend behaviour, or the default profile.
+        qps (dict): Per-API QPS for the shared rate limiter, or its defaults.
+
+    Returns:
+        dict: 'meta' describing the run and one 'results' entry per level.
+    """
+    server = start_fake_server(backend or FakeBackendConfig())
+    os.environ["GOOGLE_MAPS_BASE_URL"] = server.url
+    os.environ["WTTR_BASE_URL"] = server.url + "/"
+    configure_default_rate_limiter(qps)
+    # Rebuild the long-lived agents so they pick up the backend and limiter above.
+    realestate.AGENTS.reset()
+    travel.AGENTS.reset()
+
+    # Every agent call is recorded as a span; size the buffer for a whole level.
+    previous_exporter = get_exporter()
+    exporter = set_exporter(RingBufferExporter(capacity=max(10_000, requests * 16)))
+    results = []
+    try:
+        for orchestrator in orchestrators:
+            for concurrency in concurrency_levels:
+                results.append(run_level(server, exporter, orchestrator, concurrency, requests, unique))
+    finally:
+        set_exporter(previous_exporter)
+        server.stop()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "requests_per_level": requests,
+            "unique_inputs": unique,
+            "backend": {
+                name: vars(profile) for name, profile in (backend or FakeBackendConfig()).profiles.items()
+            },
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, tolerance=0.10):
+    """
+    Lists end-to-end regressions of `current` against `baseline`: a p95 latency
+    or throughput more than `tolerance` worse at the same orchestrator and
+    concurrency level.
+
+    Returns:
+        list: One human-readable line per regression.
+    """
+    previous = {(r["orchestrator"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["orchestrator"], result["concurrency"]))
+        if before is None:
+            continue
+        label = f"{result['orchestrator']} @ concurrency {result['concurrency']}"
+        p95_before, p95_now = before["end_to_end"]["p95"], result["end_to_end"]["p95"]
+        if p95_now > p95_before * (1 + tolerance):
+            regressions.append(f"{label}: p95 {p95_before:.1f} ms -> {p95_now:.1f} ms")
+        rps_before, rps_now = before["throughput_rps"], result["throughput_rps"]
+        if rps_now < rps_before * (1 - tolerance):
+            regressions.append(f"{label}: throughput {rps_before:.1f} -> {rps_now:.1f} req/s")
+    return regressions
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the A2A orchestrators against a fake backend.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="Orchestrator calls per level")
+    parser.add_argument("--unique", type=int, default=25, help="Distinct addresses / cities")
+    parser.add_argument("--orchestrator", choices=["analyze_property", "plan_trip"], nargs="+",
+                        default=["analyze_property", "plan_trip"])
+    parser.add_argument("--latency-ms", type=float, default=None, help="Median backend latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--qps", nargs="+", default=[], metavar="API=QPS",
+                        help="Rate limiter QPS overrides, e.g. places=100")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=None, help="Earlier results to check for regressions")
+    args = parser.parse_args()
+
+    backend = FakeBackendConfig()
+    for profile in backend.profiles.values():
+        if args.latency_ms is not None:
+            profile.median_ms = args.latency_ms
+        profile.error_rate = args.error_rate
+
+    qps = {api: float(value) for api, value in (item.split("=", 1) for item in args.qps)}
+    report = run_benchmark(args.concurrency, args.requests, args.unique, args.orchestrator, backend, qps)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for result in report["results"]:
+        e2e = result["end_to_end"]
+        print(f"{result['orchestrator']:>16} c={result['concurrency']:<3} "
+              f"p50={e2e['p50']:.1f}ms p95={e2e['p95']:.1f}ms p99={e2e['p99']:.1f}ms "
+              f"{result['throughput_rps']:.1f} req/s upstream={sum(result['upstream_calls'].values())}")
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report)
+        print("\nRegressions:" if regressions else "\nNo regressions against the baseline.")
+        for line in regressions:
+            print(f"  {line}")
@@ -0,0 +1,428 @@
+"""
+A multi-process transport for the agents.
+
+Every agent type runs in its own pool of worker processes, each serving
+requests from a bounded queue on a few threads, so CPU-bound work such as
+JSON parsing and result post-processing spreads over every core instead of
+sharing one GIL. The bus has the same get() interface as an AgentRegistry and
+returns proxies with the agents' methods, so it can be passed anywhere an
+orchestrator takes `agents`:
+
+    with AgentBus.from_registry(realestate.AGENTS, workers=4) as bus:
+        realestate.analyze_property(address, agents=bus)
+
+Each worker process keeps its own in-memory caches and single-flight state;
+the SQLite geocode cache is shared through its file. Each worker of an agent
+type gets an equal share of every API's QPS, so the bus stays within the
+limits as long as each API is called by one agent type, as in the
+orchestrators' registries.
+Only synchronous methods can be called through the bus, and their arguments
+and results must be picklable.
+"""
+
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from deadline import DeadlineExceeded, deadline_scope, expired, remaining
+from ratelimit import configure_default_rate_limiter, default_rate_limiter
+
+# Requests that may wait in each agent type's queue before callers block.
+DEFAULT_QUEUE_SIZE = 64
+
+# Threads per worker process; agents mostly wait on the network.
+DEFAULT_THREADS = 4
+
+# Seconds a worker process may take to build its agent.
+STARTUP_TIMEOUT = 60
+
+# Seconds between checks that every worker process is still alive.
+WORKER_CHECK_INTERVAL = 1.0
+
+# Simple attribute values copied to the proxies; others show up as REMOTE.
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+class BusWorkerError(RuntimeError):
+    """
+    Raised for a request whose worker process died, or whose error could not
+    be sent back from the worker.
+    """
+
+
+class _RemoteValue:
+    """
+    Stands in on a proxy for an agent attribute that lives in the worker
+    (e.g. a POI index): it is not None, but cannot be used locally.
+    """
+    def __repr__(self):
+        return "<remote>"
+
+
+class BusInitError(ValueError):
+    """
+    Raised by start() and get() when a worker process could not build its
+    agent. A ValueError, like the factory errors an AgentRegistry raises, so
+    the orchestrators report it the same way.
+    """
+
+
+REMOTE = _RemoteValue()
+
+
+# --- Worker Process ---
+
+def _describe(agent):
+    """
+    Lists an agent's public methods and instance attributes for its proxies.
+    """
+    methods = [name for name in dir(type(agent))
+               if not name.startswith("_") and callable(getattr(type(agent), name))]
+    attributes = {
+        name: value if isinstance(value, _PLAIN_TYPES) else REMOTE
+        for name, value in vars(agent).items()
+        if not name.startswith("_")
+    }
+    return methods, attributes
+
+
+def _serve(agent, requests, responses):
+    while True:
+        message = requests.get()
+        if message is None:
+            # Pass the shutdown on to the next thread of this process.
+            requests.put(None)
+            return
+        request_id, method, args, kwargs, budget = pickle.loads(message)
+        try:
+            with deadline_scope(budget):
+                ok, payload = True, getattr(agent, method)(*args, **kwargs)
+        except Exception as e:
+            ok, payload = False, e
+        # Pickle here rather than in the queue's feeder thread, where a failure
+        # would drop the response and leave the caller waiting.
+        try:
+            payload = pickle.dumps(payload)
+        except Exception as e:
+            ok, payload = False, pickle.dumps(BusWorkerError(f"{method}: cannot send {payload!r}: {e}"))
+        responses.put((request_id, os.getpid(), ok, payload))
+
+
+def _worker_main(factory, requests, responses, threads, qps):
+    """
+    Builds one agent and serves its requests on `threads` threads until a
+    None message arrives.
+    """
+    configure_default_rate_limiter(qps)
+    try:
+        agent = factory()
+        description = _describe(agent)
+    except Exception as e:
+        error = BusInitError(f"agent initialization failed: {e!r}")
+        responses.put((None, os.getpid(), False, pickle.dumps(error)))
+        return
+    responses.put((None, os.getpid(), True, pickle.dumps(description)))
+    workers = [threading.Thread(target=_serve, args=(agent, requests, responses), daemon=True)
+               for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+# --- Bus ---
+
+class RemoteAgent:
+    """
+    A proxy for one agent type on the bus. Methods are called in a worker
+    process; simple attributes (name, API key, ...) are read locally.
+    """
+    def __init__(self, bus, key, methods, attributes):
+        self._bus = bus
+        self._key = key
+        self._methods = set(methods)
+        self.__dict__.update(attributes)
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self._methods:
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self._bus.call(self._key, name, *args, **kwargs)
+
+        call.__name__ = call.__qualname__ = f"{self._key}.{name}"
+        return call
+
+    def __repr__(self):
+        return f"<RemoteAgent {self._key}>"
+
+
+class AgentBus:
+    """
+    Runs each agent type as a pool of worker processes behind a bounded
+    request queue.
+
+    A call blocks while its agent type's queue is full (backpressure), and
+    both the wait for queue space and the wait for the result are bounded
+    by the caller's deadline, which is also passed on to the worker.
+
+    Args:
+        factories (dict): Maps an agent key to a picklable zero-argument
+            callable that builds the agent, as in an AgentRegistry.
+        workers (int or dict): Worker processes per agent type (or per key).
+            Defaults to one per CPU core.
+        threads (int): Threads serving requests in each worker process.
+        queue_size (int): Requests that may wait per agent type.
+        start_method (str): The multiprocessing start method ('spawn' by
+            default, which works the same on every platform).
+    """
+    def __init__(self, factories, workers=None, threads=DEFAULT_THREADS, queue_size=DEFAULT_QUEUE_SIZE,
+                 start_method="spawn"):
+        self._factories = dict(factories)
+        default_workers = os.cpu_count() or 1
+        if isinstance(workers, dict):
+            self._workers = {key: workers.get(key, default_workers) for key in self._factories}
+        else:
+            self._workers = {key: workers or default_workers for key in self._factories}
+        self.threads = threads
+        self.queue_size = queue_size
+        self._context = multiprocessing.get_context(start_method)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._proxies = {}
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._dispatcher = None
+        self._started = False
+
+    @classmethod
+    def from_registry(cls, registry, **options):
+        """
+        Builds a bus serving the agents of an AgentRegistry.
+        """
+        return cls(registry.factories(), **options)
+
+    def start(self):
+        """
+        Starts the worker processes and waits until every agent is built.
+
+        Raises:
+            BusInitError: If an agent could not be built in time.
+        """
+        if self._started:
+            return self
+        self._responses = self._context.Queue()
+        self._requests = {}
+        self._processes = {}
+        descriptions = {}
+        for key in self._factories:
+            self._requests[key] = self._context.Queue(maxsize=self.queue_size)
+            self._processes[key] = self._spawn(key, self._workers[key])
+            for _ in range(self._workers[key]):
+                try:
+                    _, _, ok, payload = self._responses.get(timeout=STARTUP_TIMEOUT)
+                    payload = pickle.loads(payload)
+                except queue.Empty:
+                    ok, payload = False, BusInitError(f"{key} worker did not start in {STARTUP_TIMEOUT}s")
+                if not ok:
+                    self._started = True
+                    self.close()
+                    raise payload
+                descriptions[key] = payload
+
+        self._proxies = {key: RemoteAgent(self, key, *description) for key, description in descriptions.items()}
+        self._dispatcher = threading.Thread(target=self._dispatch, name="agent-bus-dispatch", daemon=True)
+        self._dispatcher.start()
+        self._started = True
+        return self
+
+    def get(self, key):
+        """
+        Returns the proxy for the agent type `key`, starting the bus on first use.
+
+        Raises:
+            KeyError: If no factory is registered under `key`.
+            BusInitError: If the bus was not started and an agent could not
+                be built.
+        """
+        if not self._started:
+            with self._start_lock:
+                if not self._started:
+                    self.start()
+        return self._proxies[key]
+
+    def call(self, key, method, *args, **kwargs):
+        """
+        Calls `method` on an agent of type `key` in a worker process.
+
+        Returns:
+            The method's return value.
+
+        Raises:
+            DeadlineExceeded: If the deadline passes while waiting for queue
+                space or for the result.
+            BusWorkerError: If the worker died while the call was queued or
+                being handled.
+        """
+        request_id = next(self._ids)
+        message = pickle.dumps((request_id, method, args, kwargs, remaining()))
+        future = Future()
+        with self._lock:
+            self._pending[request_id] = (key, future)
+        try:
+            # Wait for queue space a little at a time: if the pool dies meanwhile
+            # it restarts on a new queue and fails this call (see _check_workers).
+            while not future.done():
+                left = remaining()
+                try:
+                    self._requests[key].put(message, timeout=WORKER_CHECK_INTERVAL if left is None
+                                            else min(WORKER_CHECK_INTERVAL, left))
+                    break
+                except queue.Full:
+                    if expired():
+                        raise DeadlineExceeded(f"{key} queue stayed full until the deadline") from None
+            try:
+                return future.result(timeout=remaining())
+            except FutureTimeoutError:
+                raise DeadlineExceeded(f"{key}.{method} missed its deadline") from None
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Per agent type, its worker processes still alive, requests
+            waiting in its queue (where the platform reports it) and calls in
+            flight.
+        """
+        with self._lock:
+            in_flight = {key: 0 for key in self._factories}
+            for key, _ in self._pending.values():
+                in_flight[key] += 1
+        stats = {}
+        for key in self._factories:
+            try:
+                queued = self._requests[key].qsize() if self._started else 0
+            except NotImplementedError:
+                queued = None
+            stats[key] = {
+                "workers": sum(p.is_alive() for p in self._processes.get(key, ())) if self._started else 0,
+                "queued": queued,
+                "in_flight": in_flight[key],
+            }
+        return stats
+
+    def reset(self):
+        """
+        Restarts the worker processes, so every agent is rebuilt (the same
+        contract as AgentRegistry.reset).
+        """
+        with self._start_lock:
+            if self._started:
+                self.close()
+                self.start()
+
+    def close(self):
+        """
+        Stops the worker processes. Calls still in flight fail.
+        """
+        if not self._started:
+            return
+        # Stops the dispatcher from respawning the workers as they exit.
+        self._started = False
+        for key in self._processes:
+            try:
+                self._requests[key].put(None, timeout=1)
+            except queue.Full:
+                pass
+        for processes in self._processes.values():
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        self._responses.put((None, None, None, None))
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=5)
+            self._dispatcher = None
+        self._fail_pending(lambda key: True, BusWorkerError("agent bus closed"))
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _dispatch(self):
+        """
+        Hands responses to their callers and notices dead workers. Liveness is
+        checked on a timer, so a crashed worker is noticed even while the
+        others keep answering.
+        """
+        next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+        while True:
+            now = time.monotonic()
+            if now >= next_check:
+                self._check_workers()
+                next_check = now + WORKER_CHECK_INTERVAL
+            try:
+                request_id, pid, ok, payload = self._responses.get(timeout=max(0.0, next_check - now))
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                # The queue was closed under us at interpreter exit.
+                return
+            if pid is None:
+                return
+            with self._lock:
+                entry = self._pending.get(request_id)
+            if entry is None:
+                # The caller gave up on its deadline.
+                continue
+            payload = pickle.loads(payload)
+            if ok:
+                entry[1].set_result(payload)
+            else:
+                entry[1].set_exception(payload)
+
+    def _check_workers(self):
+        for key, processes in self._processes.items():
+            if not self._started or all(p.is_alive() for p in processes):
+                continue
+            # A process killed while reading its queue can leave the queue's
+            # lock held, so the whole pool restarts on a fresh queue. We cannot
+            # tell which request the dead worker held, so every call waiting on
+            # that agent type fails rather than hanging.
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            self._requests[key] = self._context.Queue(maxsize=self.queue_size)
+            self._fail_pending(lambda k: k == key, BusWorkerError(f"{key} worker process died"))
+            self._processes[key] = self._spawn(key, self._workers[key])
+
+    def _spawn(self, key, count):
+        # Every worker of an agent type gets an equal share of each API's QPS.
+        qps = {api: rate / self._workers[key] for api, rate in default_rate_limiter().qps.items()}
+        spawned = []
+        for _ in range(count):
+            process = self._context.Process(
+                target=_worker_main, name=f"agent-{key}",
+                args=(self._factories[key], self._requests[key], self._responses, self.threads, qps), daemon=True,
+            )
+            process.start()
+            spawned.append(process)
+        return spawned
+
+    def _fail_pending(self, matches, error):
+        with self._lock:
+            failed = [future for key, future in self._pending.values() if matches(key)]
+        for future in failed:
+            if not future.done():
+                future.set_exception(error)
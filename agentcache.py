@@ -0,0 +1,609 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from geoutils import geohash_center, geohash_encode, geohash_half_diagonal_m, haversine_m
+
+# --- Address Normalization ---
+
+_WHITESPACE = re.compile(r"\s+")
+_SEPARATORS = re.compile(r"\s*([,;])\s*")
+_PERIODS = re.compile(r"\.(?!\d)")
+# Unit designators ('Apt 4B', 'Suite 200', '#12', 'Unit C-3', 'Apt B') up to the
+# next separator. The value must contain a digit or be a single letter, so
+# street names such as 'Unit Road' or 'Suite Dr' are kept.
+_UNIT = re.compile(r"(?:,\s*|\s+)(?:apt|apartment|unit|suite|room|rm|#)\s*#?\s*"
+                   r"(?:[a-z-]*\d[a-z0-9-]*|[a-z])\b(?=\s*(?:[,;]|$))")
+_WORD = re.compile(r"[a-z]+")
+_PARTS = re.compile(r"([,;] )")
+
+# USPS street suffix abbreviations, so 'Main Street' and 'Main St' share a key.
+_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "av": "ave", "boulevard": "blvd", "road": "rd",
+    "drive": "dr", "lane": "ln", "court": "ct", "place": "pl", "parkway": "pkwy",
+    "highway": "hwy", "terrace": "ter", "circle": "cir", "square": "sq", "expressway": "expy",
+}
+_SUFFIXES = set(_ABBREVIATIONS.values())
+
+# USPS directional abbreviations. Unlike suffixes these are only applied in
+# the pre- or post-directional position: 'East St' is a street named East.
+_DIRECTIONALS = {
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw",
+}
+
+
+def _abbreviate(match):
+    word = match.group(0)
+    return _ABBREVIATIONS.get(word, word)
+
+
+def _abbreviate_directionals(part):
+    """
+    Abbreviates the directionals of one comma-separated part of an address:
+    a pre-directional follows the house number and comes before more than a
+    suffix ('10 North Main St'), a post-directional ends the part and follows
+    a suffix ('Main St Northwest'). City and state names such as 'North
+    Carolina' are left alone.
+    """
+    words = part.split(" ")
+    for i, word in enumerate(words):
+        if word not in _DIRECTIONALS:
+            continue
+        before = words[i - 1] if i else None
+        after = words[i + 1] if i + 1 < len(words) else None
+        pre = before is not None and before.isdigit() and after is not None and after not in _SUFFIXES
+        post = after is None and before in _SUFFIXES
+        if pre or post:
+            words[i] = _DIRECTIONALS[word]
+    return " ".join(words)
+
+
+def normalize_address(address):
+    """
+    Builds the cache key for an address: lower-cased, trimmed, with runs of
+    whitespace collapsed, consistent spacing around separators, street
+    suffixes and directionals abbreviated ('Street' -> 'st') and unit numbers
+    dropped, since every unit of a building geocodes to the same point.
+
+    Args:
+        address (str): The address as typed by the user.
+
+    Returns:
+        str: The normalized address.
+    """
+    key = _WHITESPACE.sub(" ", _PERIODS.sub("", address.strip().lower()))
+    key = _UNIT.sub("", key)
+    key = _SEPARATORS.sub(r"\1 ", key)
+    key = _WORD.sub(_abbreviate, key)
+    key = "".join(_abbreviate_directionals(part) for part in _PARTS.split(key))
+    return key.strip(" ,;")
+
+
+def dedupe_addresses(addresses):
+    """
+    Normalizes a batch of addresses and groups those that share a key.
+
+    Args:
+        addresses (list): The addresses as typed by the users.
+
+    Returns:
+        tuple: (keys, unique) where keys[i] is the normalized key of
+        addresses[i] and `unique` maps every distinct key to the first address
+        that produced it, in input order.
+    """
+    # Exact repeats are common in bulk input; normalize each spelling once.
+    seen = {}
+    unique = {}
+    keys = []
+    for address in addresses:
+        key = seen.get(address)
+        if key is None:
+            key = seen[address] = normalize_address(address)
+            unique.setdefault(key, address)
+        keys.append(key)
+    return keys, unique
+
+
+# --- Geocode Cache ---
+
+# Writes between checks for expired and overflowing entries.
+EVICT_EVERY = 256
+
+# Seconds a write waits for another connection (or process) holding the
+# database lock.
+BUSY_TIMEOUT = 5.0
+
+class GeocodeCache:
+    """
+    A persistent cache of geocoding results backed by a local SQLite file.
+
+    Entries are keyed by the normalized address, expire after `ttl` seconds and
+    the oldest entries are evicted once the cache holds more than `max_entries`
+    (checked every EVICT_EVERY writes, so it may briefly run over). The
+    database runs in WAL mode so several processes can share the file.
+    A small in-memory LRU sits in front of SQLite so hot addresses are served
+    without touching the database.
+    """
+    def __init__(self, path="geocode_cache.sqlite3", ttl=30 * 24 * 3600,
+                 max_entries=100_000, memory_entries=4096):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " key TEXT PRIMARY KEY,"
+            " lat REAL NOT NULL,"
+            " lng REAL NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS geocode_created ON geocode (created)")
+        self._conn.commit()
+
+    def get(self, address):
+        """
+        Looks up the coordinates of an address.
+
+        Args:
+            address (str): The address to look up.
+
+        Returns:
+            dict: A dictionary with 'lat' and 'lng', or None on a miss.
+        """
+        key = normalize_address(address)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+
+            row = self._conn.execute(
+                "SELECT lat, lng, created FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] >= self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM geocode WHERE key = ?", (key,))
+                    self._conn.commit()
+                self._memory.pop(key, None)
+                self.misses += 1
+                return None
+
+            location = {"lat": row[0], "lng": row[1]}
+            self._remember(key, location, row[2])
+            self.hits += 1
+            return dict(location)
+
+    def set(self, address, location):
+        """
+        Stores the coordinates of an address.
+
+        Args:
+            address (str): The address that was geocoded.
+            location (dict): A dictionary with 'lat' and 'lng' keys.
+        """
+        with self._lock:
+            self._store(normalize_address(address), location, time.time())
+            self._evict()
+
+    def warm_from_file(self, path):
+        """
+        Pre-loads the cache from a file of already geocoded addresses.
+
+        The file is either a CSV with 'address', 'lat' and 'lng' columns or,
+        for a '.jsonl' / '.json' extension, one JSON object per line with the
+        same keys.
+
+        Args:
+            path (str): The file to load.
+
+        Returns:
+            int: The number of entries loaded.
+        """
+        if os.path.splitext(path)[1].lower() in (".jsonl", ".json"):
+            with open(path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        else:
+            with open(path, newline="", encoding="utf-8") as f:
+                records = list(csv.DictReader(f))
+
+        now = time.time()
+        with self._lock:
+            for record in records:
+                location = {"lat": float(record["lat"]), "lng": float(record["lng"])}
+                self._store(normalize_address(record["address"]), location, now)
+            self._evict(force=True)
+        return len(records)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counters, hit ratio and number of stored entries.
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": size,
+            }
+
+    def clear(self):
+        """
+        Removes every entry and resets the counters.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM geocode")
+            self._conn.commit()
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _store(self, key, location, created):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO geocode (key, lat, lng, created) VALUES (?, ?, ?, ?)",
+            (key, location["lat"], location["lng"], created),
+        )
+        self._remember(key, location, created)
+
+    def _remember(self, key, location, created):
+        self._memory[key] = ({"lat": location["lat"], "lng": location["lng"]}, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, force=False):
+        self._writes += 1
+        if not force and self._writes % EVICT_EVERY:
+            self._conn.commit()
+            return
+        self._conn.execute("DELETE FROM geocode WHERE created <= ?", (time.time() - self.ttl,))
+        overflow = self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM geocode WHERE key IN "
+                "(SELECT key FROM geocode ORDER BY created LIMIT ?)",
+                (overflow,),
+            )
+            self._memory.clear()
+        self._conn.commit()
+
+
+_default_geocode_cache = None
+_default_geocode_cache_lock = threading.Lock()
+
+
+def default_geocode_cache():
+    """
+    Returns the process-wide geocode cache shared by every LocationAgent.
+
+    The SQLite file is taken from the GEOCODE_CACHE_PATH environment variable
+    (default 'geocode_cache.sqlite3'). Setting it to an empty string disables
+    caching, in which case None is returned.
+    """
+    global _default_geocode_cache
+    path = os.getenv("GEOCODE_CACHE_PATH", "geocode_cache.sqlite3")
+    if not path:
+        return None
+    with _default_geocode_cache_lock:
+        if _default_geocode_cache is None:
+            _default_geocode_cache = GeocodeCache(path)
+        return _default_geocode_cache
+
+
+# --- Places Cache ---
+
+# Search radii (meters) that requests are rounded up to before hitting the API.
+DEFAULT_RADIUS_BUCKETS = (500, 1000, 2000, 5000, 10000, 20000, 50000)
+
+
+# The fields of a Places result the agents read; the rest (photos, icons,
+# plus_code, viewport, ...) is dropped before caching.
+_PLACE_FIELDS = ("place_id", "name", "vicinity", "formatted_address", "types")
+
+
+def _trim_place(place):
+    trimmed = {field: place[field] for field in _PLACE_FIELDS if field in place}
+    location = place.get("geometry", {}).get("location")
+    if location is not None:
+        trimmed["geometry"] = {"location": {"lat": location["lat"], "lng": location["lng"]}}
+    return trimmed
+
+
+class PlacesCache:
+    """
+    An in-memory spatial cache of Places API results.
+
+    Entries are keyed by (geohash cell, place type, radius bucket). On a miss
+    the API is queried once from the center of the cell with the bucket radius
+    widened by the cell's half-diagonal, so the stored results cover a circle of
+    the bucket radius around any point in the cell. Every lookup, hit or miss,
+    is then filtered to the exact requested radius around the exact point.
+    Results are trimmed to the fields the agents read (name, address,
+    location, types and place_id) before they are stored.
+    """
+    def __init__(self, precision=7, ttl=24 * 3600, radius_buckets=DEFAULT_RADIUS_BUCKETS,
+                 max_entries=10_000):
+        self.precision = precision
+        self.ttl = ttl
+        self.radius_buckets = tuple(sorted(radius_buckets))
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def radius_bucket(self, radius):
+        """
+        Returns:
+            int: The smallest bucket radius that is at least `radius`, or
+            `radius` itself if it is larger than every bucket.
+        """
+        for bucket in self.radius_buckets:
+            if radius <= bucket:
+                return bucket
+        return radius
+
+    def lookup(self, location, place_type, radius, fetch, exact_radius=False):
+        """
+        Returns the raw Places results of `place_type` within `radius` meters of
+        `location`, calling `fetch` only on a miss.
+
+        Args:
+            location (dict): A dictionary with 'lat' and 'lng' keys.
+            place_type (str): The type of place searched for.
+            radius (int): The exact search radius in meters.
+            fetch (callable): fetch(center, radius) -> list of raw place results.
+                Called with the cell center and the widened bucket radius.
+            exact_radius (bool): Search and cache under `radius` itself instead
+                of rounding it up to a bucket. A search returns at most one
+                page of results, so rounding a radius that is already wide up
+                to the next bucket leaves fewer of them inside `radius`.
+
+        Returns:
+            list: The place results inside the exact radius, trimmed to the
+            fields listed in _PLACE_FIELDS plus geometry.location.
+        """
+        cell = geohash_encode(location["lat"], location["lng"], self.precision)
+        bucket = radius if exact_radius else self.radius_bucket(radius)
+        key = (cell, place_type.strip().lower(), bucket)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.hits += 1
+                places = entry[0]
+            else:
+                self.misses += 1
+                places = None
+
+        if places is None:
+            places = [_trim_place(place) for place in fetch(geohash_center(cell),
+                                                            bucket + geohash_half_diagonal_m(cell)) or ()]
+            with self._lock:
+                self._entries[key] = (places, now)
+                self._entries.move_to_end(key)
+                self._evict(now)
+
+        return [place for place in places if _within(place, location, radius)]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counters, hit ratio and number of cached cells.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self, now):
+        # Entries are kept in insertion order, so the oldest one is always first.
+        while self._entries:
+            _, created = next(iter(self._entries.values()))
+            if now - created < self.ttl and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+
+def _within(place, location, radius):
+    """
+    True if a raw place result lies within `radius` meters of `location`.
+    Results without a geometry cannot be placed and are kept.
+    """
+    point = place.get("geometry", {}).get("location")
+    if not point:
+        return True
+    return haversine_m(location["lat"], location["lng"], point["lat"], point["lng"]) <= radius
+
+
+_default_places_cache = PlacesCache()
+
+
+def default_places_cache():
+    """
+    Returns the process-wide Places cache shared by every amenities agent.
+    """
+    return _default_places_cache
+
+
+# --- Weather Cache ---
+
+class WeatherCache:
+    """
+    An in-memory cache of weather reports keyed by coordinates rounded to a grid.
+
+    wttr.in refreshes its data on a fixed interval, so every entry expires at the
+    next interval boundary instead of a fixed time after it was fetched. With
+    `refresh_hot` enabled, a background thread re-fetches entries that were hit
+    at least `hot_threshold` times shortly before they expire, so popular
+    locations never see a miss.
+    """
+    def __init__(self, grid=0.01, interval=900, max_entries=10_000, refresh_hot=False,
+                 hot_threshold=3, refresh_ahead=60):
+        self.grid = grid
+        self.interval = interval
+        self.max_entries = max_entries
+        self.hot_threshold = hot_threshold
+        self.refresh_ahead = refresh_ahead
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        # key -> [value, expires, hits, fetch]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stopped = threading.Event()
+        if refresh_hot:
+            self.start_refresher()
+
+    def grid_point(self, location):
+        """
+        Returns:
+            tuple: The grid key of a location and its grid point as a dictionary
+            with 'lat' and 'lng'.
+        """
+        key = (round(location["lat"] / self.grid), round(location["lng"] / self.grid))
+        return key, {"lat": round(key[0] * self.grid, 6), "lng": round(key[1] * self.grid, 6)}
+
+    def lookup(self, location, fetch):
+        """
+        Returns the weather for `location`, calling `fetch` only on a miss.
+
+        Args:
+            location (dict): A dictionary with 'lat' and 'lng' keys.
+            fetch (callable): fetch(grid_point) -> weather report. Called with the
+                grid point so every location in a cell shares one upstream query.
+
+        Returns:
+            The cached or freshly fetched weather report.
+        """
+        key, point = self.grid_point(location)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                entry[2] += 1
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = fetch(point)
+        with self._lock:
+            self._entries[key] = [value, self._expiry(now), 0, lambda: fetch(point)]
+            self._entries.move_to_end(key)
+            self._evict(now)
+        return value
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit, miss and background refresh counters, hit ratio and size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.refreshes = 0
+
+    def start_refresher(self, check_every=15):
+        """
+        Starts the background thread that refreshes hot entries before they expire.
+        """
+        if self._refresher is not None:
+            return
+        self._stopped.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, args=(check_every,), name="weather-cache-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    def stop_refresher(self):
+        self._stopped.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+    def _expiry(self, now):
+        return (now // self.interval + 1) * self.interval
+
+    def _evict(self, now):
+        # Entries are kept in expiry order, so the first one expires soonest.
+        while self._entries:
+            expires = next(iter(self._entries.values()))[1]
+            if now < expires and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def _refresh_loop(self, check_every):
+        while not self._stopped.wait(check_every):
+            now = time.time()
+            with self._lock:
+                due = [
+                    (key, entry[3]) for key, entry in self._entries.items()
+                    if entry[2] >= self.hot_threshold and entry[1] - now <= self.refresh_ahead
+                ]
+            for key, refetch in due:
+                try:
+                    value = refetch()
+                except Exception:
+                    continue
+                with self._lock:
+                    # The refreshed value is valid for the next provider interval.
+                    self._entries[key] = [value, self._expiry(now + self.refresh_ahead), 0, refetch]
+                    self._entries.move_to_end(key)
+                    self.refreshes += 1
+
+
+# Background refresh of hot keys is opt-in, since it keeps spending quota.
+_default_weather_cache = WeatherCache(refresh_hot=bool(os.getenv("WEATHER_CACHE_REFRESH")))
+
+
+def default_weather_cache():
+    """
+    Returns the process-wide weather cache shared by every WeatherAgent.
+    Set WEATHER_CACHE_REFRESH=1 to refresh hot locations in the background.
+    """
+    return _default_weather_cache
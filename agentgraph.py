@@ -0,0 +1,283 @@
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from deadline import deadline_scope, expired, remaining
+from tracing import trace_span
+
+# Threads shared by the blocking nodes of every graph run through run_sync.
+GRAPH_WORKERS = 64
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _graph_loop():
+    """
+    Returns the long-lived event loop that run_sync schedules graphs on. It
+    runs in a daemon thread, so it works the same for callers that already
+    have a loop of their own (e.g. notebooks), and its thread pool is reused
+    across calls.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=GRAPH_WORKERS, thread_name_prefix="agentgraph"))
+            threading.Thread(target=loop.run_forever, name="agentgraph-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+class Node:
+    """
+    One agent call in an AgentGraph.
+
+    Attributes:
+        name (str): The name its output is published under.
+        func (callable): The agent method; called with the outputs of
+            `inputs`, in order. Blocking functions run in a worker thread,
+            coroutine functions on the event loop.
+        inputs (tuple): Names of the graph inputs and nodes it depends on.
+        timeout (float): Seconds the call may take, or None.
+        share (float): Fraction of the time left before the deadline the call
+            may use, or None for all of it.
+        fallback: The output published if the call fails, times out or is
+            skipped.
+        cache: Optional object with get(key) / set(key, value) consulted
+            before calling `func` (a GeocodeCache fits). Both run on worker
+            threads, so they must be thread-safe.
+        cache_key (callable): Builds the cache key from the inputs; defaults
+            to the single input, or the tuple of inputs.
+    """
+    __slots__ = ("name", "func", "inputs", "timeout", "share", "fallback", "cache", "cache_key")
+
+    def __init__(self, name, func, inputs=(), timeout=None, share=None, fallback=None, cache=None,
+                 cache_key=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.timeout = timeout
+        self.share = share
+        self.fallback = fallback
+        self.cache = cache
+        self.cache_key = cache_key
+
+    def key(self, args):
+        if self.cache_key is not None:
+            return self.cache_key(*args)
+        return args[0] if len(args) == 1 else args
+
+
+# Why a node's output is missing, by status, for the orchestrators to report.
+_MISSING_REASONS = {
+    "timeout": "deadline exceeded",
+    "error": "the call failed",
+    "skipped": "an input was unavailable",
+}
+
+
+class GraphResult:
+    """
+    The outcome of one AgentGraph run.
+
+    Attributes:
+        values (dict): Every graph input and node output, by name.
+        status (dict): For every node: 'ok', 'cached', 'timeout', 'error' or
+            'skipped' (an input it needed was None or did not complete).
+        timings (dict): Seconds each node that ran took.
+        missing (list): Nodes that did not produce a real output, in the
+            order they finished.
+    """
+    __slots__ = ("values", "status", "timings", "missing")
+
+    def __init__(self, values):
+        self.values = dict(values)
+        self.status = {}
+        self.timings = {}
+        self.missing = []
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def reason(self, name):
+        """
+        Returns:
+            str: Why node `name` has no real output ('deadline exceeded', ...),
+            or None if it has one.
+        """
+        return _MISSING_REASONS.get(self.status.get(name))
+
+
+class AgentGraph:
+    """
+    An orchestrator expressed as a dependency graph of agent calls.
+
+    Each node declares the graph inputs and nodes whose outputs it takes.
+    The scheduler starts every node as soon as all of its inputs are
+    available, so independent agents always run concurrently:
+
+        graph = AgentGraph("plan_trip", inputs=("city",))
+        graph.add("coordinates", location_agent.get_coordinates, ("city",))
+        graph.add("weather", weather_agent.get_weather, ("coordinates",))
+        result = await graph.run({"city": "Lisbon"}, deadline=15)
+
+    Args:
+        name (str): The orchestrator's name, used for tracing.
+        inputs (iterable): Names of the values passed to run().
+    """
+    def __init__(self, name, inputs=()):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.nodes = {}
+
+    def add(self, name, func, inputs=(), **options):
+        """
+        Adds a node. Its inputs must be graph inputs or nodes added earlier,
+        which also keeps the graph acyclic.
+
+        Args:
+            name (str): The node's output name.
+            func (callable): The agent method.
+            inputs (iterable): The names whose outputs `func` is called with.
+            **options: timeout, share, fallback, cache and cache_key (see Node).
+
+        Returns:
+            AgentGraph: The graph, so calls can be chained.
+        """
+        if name in self.nodes or name in self.inputs:
+            raise ValueError(f"{self.name}: duplicate node {name!r}")
+        unknown = [i for i in inputs if i not in self.nodes and i not in self.inputs]
+        if unknown:
+            raise ValueError(f"{self.name}: node {name!r} depends on unknown {', '.join(unknown)}")
+        self.nodes[name] = Node(name, func, inputs, **options)
+        return self
+
+    async def run(self, inputs, deadline=None, max_concurrency=None):
+        """
+        Runs every node, each as soon as its inputs are ready.
+
+        Args:
+            inputs (dict): A value for every graph input.
+            deadline (float): Seconds the whole run may take, or None.
+            max_concurrency (int): Maximum number of nodes running at once,
+                or None for no limit.
+
+        Returns:
+            GraphResult: The outputs, statuses and timings of the run.
+        """
+        missing_inputs = [name for name in self.inputs if name not in inputs]
+        if missing_inputs:
+            raise ValueError(f"{self.name}: missing inputs {', '.join(missing_inputs)}")
+
+        result = GraphResult({name: inputs[name] for name in self.inputs})
+        available = set(self.inputs)
+        pending = list(self.nodes.values())
+        running = {}
+        limit = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        with deadline_scope(deadline):
+            while pending or running:
+                for node in [n for n in pending if all(i in available for i in n.inputs)]:
+                    pending.remove(node)
+                    args = [result.values[i] for i in node.inputs]
+                    if any(arg is None for arg in args):
+                        self._publish(result, available, node, node.fallback, "skipped")
+                        continue
+                    running[asyncio.ensure_future(self._run_node(node, args, limit))] = node
+
+                if not running:
+                    # Skipped nodes may have unblocked others.
+                    continue
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node = running.pop(task)
+                    value, status, elapsed = task.result()
+                    if elapsed is not None:
+                        result.timings[node.name] = elapsed
+                    self._publish(result, available, node, value, status)
+        return result
+
+    def run_sync(self, inputs, deadline=None, max_concurrency=None):
+        """
+        Blocking version of run(). The graph runs on a shared background loop
+        (see _graph_loop), so this also works while the calling thread has an
+        event loop running, and it returns as soon as the run is done rather
+        than waiting for nodes that already timed out. The caller's context,
+        and with it any enclosing deadline, is carried over.
+        """
+        loop = _graph_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise RuntimeError(f"{self.name}: run_sync called from a graph node; await run() instead")
+        # run_coroutine_threadsafe copies the caller's context into the task.
+        return asyncio.run_coroutine_threadsafe(self.run(inputs, deadline, max_concurrency), loop).result()
+
+    @staticmethod
+    def _publish(result, available, node, value, status):
+        result.values[node.name] = value
+        result.status[node.name] = status
+        if status not in ("ok", "cached"):
+            result.missing.append(node.name)
+        available.add(node.name)
+
+    async def _run_node(self, node, args, limit):
+        """
+        Runs one node under its timeout and share of the deadline.
+
+        Returns:
+            tuple: (value, status, seconds taken or None if served from cache).
+        """
+        with trace_span(self.name, node.name, *args) as span:
+            if node.cache is not None:
+                # Cache lookups may hit disk (GeocodeCache is SQLite), so they
+                # stay off the shared event loop.
+                cached = await asyncio.to_thread(node.cache.get, node.key(args))
+                if cached is not None:
+                    span.cache = "hit"
+                    return cached, "cached", None
+                span.cache = "miss"
+
+            if limit is not None:
+                await limit.acquire()
+            try:
+                left = remaining()
+                timeout = node.timeout
+                if left is not None:
+                    budget = left * node.share if node.share is not None else left
+                    timeout = budget if timeout is None else min(timeout, budget)
+                started = time.perf_counter()
+                with deadline_scope(timeout):
+                    try:
+                        if inspect.iscoroutinefunction(node.func):
+                            call = node.func(*args)
+                        else:
+                            # to_thread copies the context, and with it the deadline.
+                            call = asyncio.to_thread(node.func, *args)
+                        value = await asyncio.wait_for(call, timeout)
+                    except asyncio.TimeoutError as e:
+                        span.fail(e, "timeout")
+                        return node.fallback, "timeout", time.perf_counter() - started
+                    except Exception as e:
+                        span.fail(e)
+                        return node.fallback, "error", time.perf_counter() - started
+                    elapsed = time.perf_counter() - started
+                    # Agents report their own failures as empty results; an
+                    # empty result after the deadline means it ran out of time.
+                    if not value and expired():
+                        span.outcome = "timeout"
+                        return node.fallback, "timeout", elapsed
+            finally:
+                if limit is not None:
+                    limit.release()
+
+            if node.cache is not None and value is not None:
+                await asyncio.to_thread(node.cache.set, node.key(args), value)
+            if not value:
+                span.outcome = "empty"
+            return value, "ok", elapsed
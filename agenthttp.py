@@ -0,0 +1,155 @@
+import os
+import threading
+
+import googlemaps
+import requests
+from requests.adapters import HTTPAdapter
+
+from cassette import Cassette, CassetteAdapter
+from deadline import request_timeout
+
+# Number of keep-alive connections kept open per host. Override with AGENT_HTTP_POOL_SIZE.
+DEFAULT_POOL_SIZE = int(os.getenv("AGENT_HTTP_POOL_SIZE", "32"))
+
+# Where the Google Maps web services live. Point GOOGLE_MAPS_BASE_URL at a
+# local stand-in (see fakemaps.py) to run the agents offline.
+GOOGLE_MAPS_BASE_URL = "https://maps.googleapis.com"
+
+_lock = threading.Lock()
+_session = None
+_pool_size = DEFAULT_POOL_SIZE
+_gmaps_clients = {}
+
+
+class _DeadlineAdapter(HTTPAdapter):
+    """
+    Bounds every request sent through the shared session by the current
+    deadline (see deadline.py), or by a default timeout when there is none.
+    """
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=request_timeout(timeout), **kwargs)
+
+
+def _cassette_from_env():
+    """
+    Reads AGENT_CASSETTE ('record:<path>' or 'replay:<path>') and
+    AGENT_CASSETTE_LATENCY (replayed latency factor, default 0).
+    """
+    setting = os.getenv("AGENT_CASSETTE")
+    if not setting:
+        return None
+    mode, _, path = setting.partition(":")
+    if mode not in ("record", "replay") or not path:
+        raise ValueError(f"AGENT_CASSETTE must be 'record:<path>' or 'replay:<path>', got {setting!r}")
+    return Cassette(path), mode, float(os.getenv("AGENT_CASSETTE_LATENCY", "0"))
+
+
+# (Cassette, mode, latency_scale) when traffic is recorded or replayed.
+_cassette = _cassette_from_env()
+
+
+def _mount_adapter(session):
+    """
+    Mounts a transport adapter built from the current pool size (and
+    cassette) on `session`, closing the one it replaces. The session object
+    itself is kept, so every client already holding it picks the change up.
+    """
+    adapter = _DeadlineAdapter(pool_connections=_pool_size, pool_maxsize=_pool_size)
+    if _cassette is not None:
+        cassette, mode, latency_scale = _cassette
+        adapter = CassetteAdapter(cassette, mode, inner=adapter, latency_scale=latency_scale)
+    previous = session.adapters.get("https://")
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if previous is not None:
+        previous.close()
+
+
+def _build_session():
+    session = requests.Session()
+    _mount_adapter(session)
+    return session
+
+
+def get_session():
+    """
+    Returns the process-wide requests.Session shared by every agent.
+
+    The session keeps connections alive in a pool, so steady-state calls to
+    wttr.in and the Google Maps endpoints reuse an open TCP+TLS connection
+    instead of doing a new handshake each time.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def configure_pool(pool_size):
+    """
+    Changes the connection pool size. A new adapter is mounted on the shared
+    session, so long-lived agents and their clients use the new pool too.
+
+    Args:
+        pool_size (int): Keep-alive connections kept open per host. Should be at
+            least the number of agent calls expected to run concurrently.
+    """
+    global _pool_size
+    with _lock:
+        _pool_size = pool_size
+        if _session is not None:
+            _mount_adapter(_session)
+
+
+def configure_cassette(path=None, mode="replay", latency_scale=0.0):
+    """
+    Records the agents' HTTP traffic to, or replays it from, a cassette (see
+    cassette.py). Like configure_pool, this mounts a new adapter on the
+    shared session, so agents already built use the cassette too.
+
+    Args:
+        path (str): The SQLite cassette file, or None to talk to the network again.
+        mode (str): 'record' or 'replay'.
+        latency_scale (float): In replay mode, how much of each recorded
+            latency to simulate (1 replays it in full, 0 not at all).
+
+    Returns:
+        Cassette: The cassette in use, or None.
+    """
+    global _cassette
+    with _lock:
+        previous = _cassette
+        _cassette = (Cassette(path), mode, latency_scale) if path else None
+        if _session is not None:
+            _mount_adapter(_session)
+        if previous is not None:
+            previous[0].close()
+        return _cassette[0] if _cassette else None
+
+
+def get_gmaps_client(api_key, base_url=None):
+    """
+    Returns the googlemaps.Client shared by every agent that uses `api_key`
+    against `base_url`.
+    The client sends its requests through the shared pooled session. Its own
+    OVER_QUERY_LIMIT retry loop is disabled so throttling reaches the shared
+    rate limiter, which backs concurrency off and retries.
+
+    Args:
+        api_key (str): The Google Maps API key.
+        base_url (str): The Maps web service base URL. Defaults to the
+            GOOGLE_MAPS_BASE_URL environment variable, then Google's servers.
+
+    Returns:
+        googlemaps.Client: The shared client.
+    """
+    base_url = base_url or os.getenv("GOOGLE_MAPS_BASE_URL", GOOGLE_MAPS_BASE_URL)
+    session = get_session()
+    with _lock:
+        client = _gmaps_clients.get((api_key, base_url))
+        if client is None:
+            client = googlemaps.Client(key=api_key, requests_session=session,
+                                       retry_over_query_limit=False, base_url=base_url)
+            _gmaps_clients[(api_key, base_url)] = client
+        return client
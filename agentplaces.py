@@ -0,0 +1,85 @@
+import asyncio
+
+from geoutils import haversine_m
+from tracing import trace_span
+
+# Seconds to wait before requesting the next page of Places results.
+NEXT_PAGE_DELAY = 2.0
+
+
+def place_summary(place, location=None):
+    """
+    Turns a raw Places result into the name / address dictionary the agents
+    return.
+
+    Args:
+        place (dict): A raw Places API result.
+        location (dict): If given, 'distance_m' from it is added (None when
+            the result has no geometry).
+
+    Returns:
+        dict: The place's 'name' and 'address', and 'distance_m' if asked for.
+    """
+    summary = {
+        "name": place.get('name'),
+        "address": place.get('vicinity', place.get('formatted_address'))
+    }
+    if location is not None:
+        point = place.get('geometry', {}).get('location')
+        summary["distance_m"] = (
+            round(haversine_m(location['lat'], location['lng'], point['lat'], point['lng']), 1)
+            if point else None
+        )
+    return summary
+
+
+async def iter_places(agent, location, place_type, radius=5000, limit=None, with_distance=False):
+    """
+    Streams places of a specific type near a location, one page at a time,
+    for any agent with `name`, `gmaps` and `rate_limiter` attributes.
+
+    Places are yielded as soon as their page arrives. Further pages are only
+    requested, following next_page_token, once the caller has consumed the
+    current one, and nothing more is fetched after `limit` places.
+
+    Args:
+        agent: The agent making the calls.
+        location (dict): A dictionary with 'lat' and 'lng' keys.
+        place_type (str): The type of place to search for.
+        radius (int): The search radius in meters.
+        limit (int): Stop after this many places, or None for every page.
+        with_distance (bool): Add each place's 'distance_m' from `location`.
+
+    Yields:
+        dict: A nearby place (see place_summary).
+    """
+    with trace_span(agent.name, "iter_nearby_places", location, place_type, radius, limit) as span:
+        yielded = 0
+        page_token = None
+        try:
+            while True:
+                if page_token:
+                    # The token is only accepted after a short delay.
+                    await asyncio.sleep(NEXT_PAGE_DELAY)
+                places_result = await asyncio.to_thread(
+                    agent.rate_limiter.call, "places", agent.gmaps.places,
+                    query=place_type,
+                    location=location,
+                    radius=radius,
+                    page_token=page_token
+                )
+                if not places_result:
+                    return
+
+                for place in places_result.get('results', []):
+                    yield place_summary(place, location if with_distance else None)
+                    yielded += 1
+                    if limit is not None and yielded >= limit:
+                        return
+
+                page_token = places_result.get('next_page_token')
+                if not page_token:
+                    return
+
+        except Exception as e:
+            span.fail(e)
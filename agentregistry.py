@@ -0,0 +1,59 @@
+import threading
+
+
+class AgentRegistry:
+    """
+    Creates each agent once, on first use, and hands the same instance to
+    every later caller and thread.
+
+    Args:
+        factories (dict): Maps an agent key to a zero-argument callable that
+            builds the agent, e.g. {"location": LocationAgent}.
+    """
+    def __init__(self, factories):
+        self._factories = dict(factories)
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the agent registered under `key`, building it if needed.
+        A factory that raises (e.g. ValueError for a missing API key) leaves
+        nothing behind, so the next call tries again.
+
+        Raises:
+            KeyError: If no factory is registered under `key`.
+        """
+        agent = self._agents.get(key)
+        if agent is not None:
+            return agent
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                agent = self._factories[key]()
+                self._agents[key] = agent
+            return agent
+
+    def register(self, key, factory):
+        """
+        Registers (or replaces) the factory for `key`. An agent already built
+        under that key is dropped.
+        """
+        with self._lock:
+            self._factories[key] = factory
+            self._agents.pop(key, None)
+
+    def factories(self):
+        """
+        Returns:
+            dict: A copy of the registered factories, by key.
+        """
+        with self._lock:
+            return dict(self._factories)
+
+    def reset(self):
+        """
+        Drops every built agent; they are rebuilt on next use.
+        """
+        with self._lock:
+            self._agents.clear()
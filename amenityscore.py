@@ -0,0 +1,171 @@
+"""
+Distance-weighted amenity scores for many properties at once.
+
+Every amenity within `radius` of a property contributes exp(-distance / decay_m)
+to its category. A category's score saturates towards 1 as more close
+amenities are added, and the overall score is the weighted mean of the
+category scores on a 0-100 scale:
+
+    python amenityscore.py listings.csv pois.parquet scores.csv --radius 1600
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from geoutils import EARTH_RADIUS_M, haversine_matrix_m
+from poiindex import normalize_category
+
+# Amenities farther than this from a property are ignored, in meters.
+DEFAULT_RADIUS = 1600
+
+# Distance at which an amenity's contribution has fallen to 1/e, in meters.
+DEFAULT_DECAY_M = 800
+
+# Upper bound on property x amenity distances held in memory at once.
+DEFAULT_MAX_CELLS = 4_000_000
+
+# Properties per block; neighbouring properties share one amenity bounding box.
+BLOCK_SIZE = 1024
+
+
+def _coordinates(frame):
+    if isinstance(frame, pd.DataFrame):
+        return frame[["lat", "lng"]].to_numpy(dtype=float)
+    return np.asarray(frame, dtype=float).reshape(-1, 2)
+
+
+def _lng_within(lngs, lo, hi):
+    """
+    True for the longitudes inside [lo, hi], where the range may run past
+    ±180° and is then split in two at the antimeridian.
+    """
+    if hi - lo >= 360:
+        return np.ones(len(lngs), dtype=bool)
+    if lo < -180:
+        return (lngs >= lo + 360) | (lngs <= hi)
+    if hi > 180:
+        return (lngs >= lo) | (lngs <= hi - 360)
+    return (lngs >= lo) & (lngs <= hi)
+
+
+def _category_stats(properties, amenities, radius, decay_m, max_cells):
+    """
+    Accumulates, for every property, the decayed amenity sum, the count within
+    `radius` and the nearest distance within `radius`.
+
+    Properties are processed in latitude order, BLOCK_SIZE at a time. Each
+    block only looks at the amenities inside its bounding box widened by
+    `radius`, at most `max_cells` distances at once.
+    """
+    n = len(properties)
+    total = np.zeros(n)
+    count = np.zeros(n, dtype=np.int64)
+    nearest = np.full(n, np.inf)
+    if n == 0 or len(amenities) == 0:
+        return total, count, nearest
+
+    order = np.argsort(properties[:, 0], kind="stable")
+    lat_pad = np.degrees(radius / EARTH_RADIUS_M)
+    rows = max(1, min(BLOCK_SIZE, max_cells))
+    for start in range(0, n, rows):
+        block = order[start:start + rows]
+        lat, lng = properties[block, 0], properties[block, 1]
+        # Longitude degrees shrink towards the poles; widen the box to match.
+        lng_pad = lat_pad / max(np.cos(np.radians(np.abs(lat).max() + lat_pad)), 1e-6)
+        candidates = amenities[
+            (amenities[:, 0] >= lat.min() - lat_pad) & (amenities[:, 0] <= lat.max() + lat_pad)
+            & _lng_within(amenities[:, 1], lng.min() - lng_pad, lng.max() + lng_pad)
+        ]
+        cols = max(1, max_cells // len(block))
+        for col in range(0, len(candidates), cols):
+            distances = haversine_matrix_m(properties[block], candidates[col:col + cols])
+            within = distances <= radius
+            total[block] += np.where(within, np.exp(-distances / decay_m), 0.0).sum(axis=1)
+            count[block] += within.sum(axis=1)
+            nearest[block] = np.minimum(nearest[block], np.where(within, distances, np.inf).min(axis=1))
+    return total, count, nearest
+
+
+def score_properties(properties, amenities, categories=None, weights=None, radius=DEFAULT_RADIUS,
+                     decay_m=DEFAULT_DECAY_M, max_cells=DEFAULT_MAX_CELLS):
+    """
+    Scores properties by the amenities around them.
+
+    Args:
+        properties (pandas.DataFrame or array-like): 'lat' and 'lng' columns,
+            or an (n, 2) array of (lat, lng) in degrees.
+        amenities (pandas.DataFrame): One row per amenity with 'category',
+            'lat' and 'lng' columns (the POI dataset format of poiindex).
+        categories (iterable): The categories to score, or None for all.
+        weights (dict): Weight of each category in the overall score;
+            unlisted categories weigh 1.
+        radius (float): Amenities farther than this many meters are ignored.
+        decay_m (float): Distance scale of the exponential decay in meters.
+        max_cells (int): Largest distance matrix computed at once, which
+            bounds memory use regardless of the number of properties.
+
+    Returns:
+        pandas.DataFrame: One row per property (keeping the index of a
+        DataFrame input) with '<category>_count', '<category>_nearest_m' (NaN
+        when nothing is within `radius`) and '<category>_score' columns plus
+        the overall 'score' from 0 to 100.
+    """
+    points = _coordinates(properties)
+    index = properties.index if isinstance(properties, pd.DataFrame) else None
+    amenity_categories = amenities["category"].map(normalize_category)
+    if categories is None:
+        categories = list(dict.fromkeys(amenity_categories))
+    weights = {normalize_category(c): w for c, w in (weights or {}).items()}
+
+    columns = {}
+    overall = np.zeros(len(points))
+    total_weight = 0.0
+    for category in categories:
+        key = normalize_category(category)
+        selected = amenities.loc[amenity_categories == key, ["lat", "lng"]].to_numpy(dtype=float)
+        total, count, nearest = _category_stats(points, selected, radius, decay_m, max_cells)
+        score = 1.0 - np.exp(-total)
+        column = key.replace(" ", "_")
+        columns[f"{column}_count"] = count
+        columns[f"{column}_nearest_m"] = np.where(np.isfinite(nearest), nearest, np.nan)
+        columns[f"{column}_score"] = score
+        weight = weights.get(key, 1.0)
+        overall += weight * score
+        total_weight += weight
+
+    columns["score"] = 100 * overall / total_weight if total_weight else overall
+    return pd.DataFrame(columns, index=index)
+
+
+def _read_frame(path):
+    if os.path.splitext(path)[1].lower() in (".parquet", ".pq"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score properties by the amenities around them.")
+    parser.add_argument("properties", help="CSV or Parquet file with lat and lng columns")
+    parser.add_argument("amenities", help="CSV or Parquet POI file with category, lat and lng columns")
+    parser.add_argument("output", help="Output file (.parquet or .csv)")
+    parser.add_argument("--categories", nargs="+", default=None)
+    parser.add_argument("--radius", type=float, default=DEFAULT_RADIUS)
+    parser.add_argument("--decay", type=float, default=DEFAULT_DECAY_M, help="Decay distance in meters")
+    args = parser.parse_args()
+
+    properties = _read_frame(args.properties)
+    started = time.perf_counter()
+    scores = score_properties(properties, _read_frame(args.amenities), args.categories,
+                              radius=args.radius, decay_m=args.decay)
+    elapsed = time.perf_counter() - started
+    result = pd.concat([properties, scores], axis=1)
+    if os.path.splitext(args.output)[1].lower() == ".csv":
+        result.to_csv(args.output, index=False)
+    else:
+        result.to_parquet(args.output, index=False)
+    print(f"Scored {len(result)} properties in {elapsed:.1f}s; results written to {args.output}")
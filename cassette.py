@@ -0,0 +1,222 @@
+"""
+Record/replay of the agents' HTTP traffic at the transport level.
+
+In record mode every request sent through the shared session (Geocoding,
+Places and wttr.in alike) is sent for real and its response stored in a
+SQLite cassette. In replay mode responses come from the cassette and nothing
+leaves the process, optionally after sleeping for the recorded latency:
+
+    AGENT_CASSETTE=record:trips.sqlite3 python travel.py
+    AGENT_CASSETTE=replay:trips.sqlite3 AGENT_CASSETTE_LATENCY=1 python agentbench.py
+
+Requests are matched on method, path and query (with the API key removed),
+not on the host, so a cassette recorded against Google also replays with
+GOOGLE_MAPS_BASE_URL pointing elsewhere.
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from deadline import request_timeout
+
+# Query parameters never written to a cassette or used to match requests.
+REDACTED_PARAMS = ("key", "signature", "client")
+
+# Response headers kept in a cassette; the rest are transport details.
+KEPT_HEADERS = ("content-type", "content-encoding", "retry-after")
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """
+    Raised in replay mode for a request that was never recorded.
+    """
+
+
+def request_key(method, url, body=None):
+    """
+    Builds the key a request is recorded and replayed under.
+
+    Returns:
+        tuple: (key, redacted) where `key` is a hex digest and `redacted` the
+        path and sorted query with credentials removed.
+    """
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k not in REDACTED_PARAMS)
+    redacted = parts.path + ("?" + urlencode(query) if query else "")
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(method.upper().encode())
+    digest.update(b" " + redacted.encode())
+    if body:
+        digest.update(b"\n" + (body if isinstance(body, bytes) else body.encode()))
+    return digest.hexdigest(), redacted
+
+
+class Cassette:
+    """
+    Recorded HTTP responses in one SQLite file, indexed by request key.
+
+    Args:
+        path (str): The cassette file; created if missing.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS interactions ("
+            " key TEXT PRIMARY KEY,"
+            " method TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " status INTEGER NOT NULL,"
+            " reason TEXT,"
+            " headers TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " elapsed REAL NOT NULL,"
+            " recorded REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Returns:
+            dict: The recorded 'status', 'reason', 'headers', 'body' and
+            'elapsed' (seconds) for `key`, or None if it was never recorded.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, reason, headers, body, elapsed FROM interactions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {
+            "status": row[0],
+            "reason": row[1],
+            "headers": json.loads(row[2]),
+            "body": bytes(row[3]),
+            "elapsed": row[4],
+        }
+
+    def put(self, key, method, url, status, reason, headers, body, elapsed):
+        """
+        Records one response, replacing an earlier recording of the same request.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO interactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, method, url, status, reason, json.dumps(headers), body, elapsed, time.time()),
+            )
+            self._conn.commit()
+            self.recorded += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Replay hits and misses, responses recorded in this session,
+            and the number of interactions stored.
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "recorded": self.recorded, "size": size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CassetteAdapter(HTTPAdapter):
+    """
+    A transport adapter that records responses to, or replays them from, a
+    Cassette.
+
+    Args:
+        cassette (Cassette): Where responses are stored.
+        mode (str): 'record' or 'replay'.
+        inner (HTTPAdapter): The adapter that sends real requests in record mode.
+        latency_scale (float): In replay mode, sleep for the recorded latency
+            times this factor (0 replays instantly). A recorded latency longer
+            than the request timeout raises a ReadTimeout, as it would have live.
+    """
+    def __init__(self, cassette, mode="replay", inner=None, latency_scale=0.0):
+        super().__init__()
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.cassette = cassette
+        self.mode = mode
+        self.inner = inner or HTTPAdapter()
+        self.latency_scale = latency_scale
+
+    def send(self, request, timeout=None, **kwargs):
+        key, redacted = request_key(request.method, request.url, request.body)
+        if self.mode == "record":
+            started = time.perf_counter()
+            response = self.inner.send(request, timeout=timeout, **kwargs)
+            body = response.content
+            elapsed = time.perf_counter() - started
+            headers = {k.lower(): v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+            self.cassette.put(key, request.method, redacted, response.status_code, response.reason,
+                              headers, body, elapsed)
+            return response
+
+        timeout = request_timeout(timeout)
+        recorded = self.cassette.get(key)
+        if recorded is None:
+            raise CassetteMiss(f"No recorded response for {request.method} {redacted}", request=request)
+        if self.latency_scale:
+            delay = recorded["elapsed"] * self.latency_scale
+            limit = timeout[-1] if isinstance(timeout, tuple) else timeout
+            if limit is not None and delay > limit:
+                time.sleep(limit)
+                raise requests.exceptions.ReadTimeout(f"Replayed latency {delay:.2f}s exceeds timeout",
+                                                      request=request)
+            time.sleep(delay)
+        return self._build_replay(request, recorded)
+
+    def close(self):
+        self.inner.close()
+        super().close()
+
+    @staticmethod
+    def _build_replay(request, recorded):
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.reason = recorded["reason"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = recorded["body"]
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=recorded["elapsed"])
+        return response
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect a recorded HTTP cassette.")
+    parser.add_argument("cassette", help="SQLite cassette file")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette)
+    rows = cassette._conn.execute(
+        "SELECT method, url, status, elapsed FROM interactions ORDER BY recorded"
+    ).fetchall()
+    for method, url, status, elapsed in rows:
+        print(f"{status} {elapsed * 1000:7.1f}ms {method} {url}")
+    print(f"\n{len(rows)} interactions")
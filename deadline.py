@@ -0,0 +1,116 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+import requests
+
+# Seconds an upstream HTTP call may take when no deadline is set, so a stalled
+# server can never block an agent forever. Override with AGENT_REQUEST_TIMEOUT.
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("AGENT_REQUEST_TIMEOUT", "30"))
+
+# Absolute time.monotonic() by which the current request must finish, or None.
+_deadline = contextvars.ContextVar("agent_deadline", default=None)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """
+    Raised instead of starting (or waiting for) an upstream call once the
+    current deadline has passed. It is a requests Timeout, so HTTP clients
+    such as googlemaps report it as their own timeout.
+    """
+
+
+def remaining():
+    """
+    Returns:
+        float: Seconds left before the current deadline (never negative), or
+        None when no deadline is set.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def expired():
+    """
+    Returns:
+        bool: Whether a deadline is set and has passed.
+    """
+    return remaining() == 0.0
+
+
+def check():
+    """
+    Raises DeadlineExceeded if the current deadline has passed.
+    """
+    if expired():
+        raise DeadlineExceeded("deadline exceeded")
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """
+    Runs the block under a deadline `seconds` from now. A scope nested in
+    another never extends it: the earlier of the two deadlines applies.
+
+    Args:
+        seconds (float): The time budget for the block, or None to keep the
+            enclosing deadline (if any).
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + max(0.0, seconds)
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def carry(func):
+    """
+    Wraps `func` so that it runs under the caller's current deadline from any
+    thread. Thread pools do not copy context variables on their own:
+
+        executor.submit(carry(agent.find_nearby_places), coordinates, place_type)
+    """
+    deadline = _deadline.get()
+
+    def run(*args, **kwargs):
+        token = _deadline.set(deadline)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    return run
+
+
+def request_timeout(timeout=None):
+    """
+    The timeout for one upstream HTTP call: the caller's own timeout (or
+    DEFAULT_REQUEST_TIMEOUT), cut to the time left before the deadline.
+
+    Args:
+        timeout (float or tuple): A requests timeout, or None.
+
+    Returns:
+        float or tuple: The timeout to pass on to the connection.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed.
+    """
+    left = remaining()
+    if left == 0.0:
+        raise DeadlineExceeded("deadline exceeded before the request was sent")
+    if timeout is None:
+        timeout = DEFAULT_REQUEST_TIMEOUT
+    if left is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        return tuple(left if t is None else min(t, left) for t in timeout)
+    return min(timeout, left)
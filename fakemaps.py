@@ -0,0 +1,466 @@
+"""
+A local stand-in for the Google Geocoding / Places text and nearby search
+endpoints and the wttr.in j1 endpoint, so the agents can run and be
+benchmarked offline.
+
+Start it and point the agents at it:
+
+    python fakemaps.py --port 8089 --latency-ms 80 --error-rate 0.01
+    export GOOGLE_MAPS_API_KEY=AIzaFakeKey        # googlemaps requires the AIza prefix
+    export GOOGLE_MAPS_BASE_URL=http://127.0.0.1:8089
+    export WTTR_BASE_URL=http://127.0.0.1:8089/
+
+Responses are deterministic for a given request and seed; only latency,
+injected errors and throttling are random.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+GEOCODE_PATH = "/maps/api/geocode/json"
+PLACES_PATH = "/maps/api/place/textsearch/json"
+NEARBY_PATH = "/maps/api/place/nearbysearch/json"
+STATS_PATH = "/__stats"
+
+# Geocoded addresses land inside this box (roughly the SF Bay Area).
+DEFAULT_BOUNDS = (37.2, 37.9, -122.6, -121.8)
+
+_WEATHER_CODES = [
+    ("113", "Sunny"), ("116", "Partly cloudy"), ("119", "Cloudy"), ("122", "Overcast"),
+    ("143", "Mist"), ("176", "Patchy rain possible"), ("296", "Light rain"), ("302", "Moderate rain"),
+]
+_WIND_POINTS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+                "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+_STREETS = ["Main St", "Oak Ave", "Castro St", "El Camino Real", "Shoreline Blvd",
+            "California St", "University Ave", "Market St", "Mission St", "Broadway"]
+_PLACE_TYPES = {
+    "school": ["school", "primary_school", "point_of_interest", "establishment"],
+    "park": ["park", "tourist_attraction", "point_of_interest", "establishment"],
+    "grocery store": ["grocery_or_supermarket", "supermarket", "food", "store",
+                      "point_of_interest", "establishment"],
+    "restaurant": ["restaurant", "food", "point_of_interest", "establishment"],
+    "tourist_attraction": ["tourist_attraction", "museum", "point_of_interest", "establishment"],
+}
+
+
+# --- Configuration ---
+
+class EndpointProfile:
+    """
+    The behaviour of one fake endpoint.
+
+    Args:
+        median_ms (float): Median response latency in milliseconds.
+        sigma (float): Spread of the log-normal latency distribution; 0 makes
+            every response take exactly `median_ms`.
+        error_rate (float): Share of requests answered with a server error.
+        qps (float): Requests per second accepted before throttling, or None.
+    """
+    def __init__(self, median_ms=50.0, sigma=0.5, error_rate=0.0, qps=None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.qps = qps
+
+    def sample_latency(self, rng):
+        """
+        Returns:
+            float: A latency in seconds drawn from the log-normal distribution.
+        """
+        return self.median_ms * math.exp(self.sigma * rng.gauss(0, 1)) / 1000.0
+
+
+class FakeBackendConfig:
+    """
+    Settings for the whole fake backend: one EndpointProfile per endpoint
+    ('geocode', 'places', 'weather'), the random seed, and Places paging.
+    """
+    def __init__(self, profiles=None, seed=0, page_size=20, max_pages=3, bounds=DEFAULT_BOUNDS):
+        self.profiles = {
+            "geocode": EndpointProfile(median_ms=40),
+            "places": EndpointProfile(median_ms=120),
+            "weather": EndpointProfile(median_ms=300, sigma=0.8),
+        }
+        self.profiles.update(profiles or {})
+        self.seed = seed
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.bounds = bounds
+
+
+# --- Payloads ---
+
+def _rng(seed, *parts):
+    digest = hashlib.sha256(repr((seed,) + parts).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _place_id(rng):
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-"
+    return "ChIJ" + "".join(rng.choice(alphabet) for _ in range(23))
+
+
+def _offset(lat, lng, distance_m, bearing):
+    dlat = distance_m * math.cos(bearing) / 111_320.0
+    dlng = distance_m * math.sin(bearing) / (111_320.0 * max(0.01, math.cos(math.radians(lat))))
+    return round(lat + dlat, 7), round(lng + dlng, 7)
+
+
+def _viewport(lat, lng, half_m=150):
+    north, east = _offset(lat, lng, half_m * math.sqrt(2), math.pi / 4)
+    south, west = _offset(lat, lng, half_m * math.sqrt(2), 5 * math.pi / 4)
+    return {"northeast": {"lat": north, "lng": east}, "southwest": {"lat": south, "lng": west}}
+
+
+def geocode_payload(config, address):
+    """
+    Builds a Geocoding API response for an address.
+    """
+    rng = _rng(config.seed, "geocode", address.strip().lower())
+    lat_lo, lat_hi, lng_lo, lng_hi = config.bounds
+    lat = round(rng.uniform(lat_lo, lat_hi), 7)
+    lng = round(rng.uniform(lng_lo, lng_hi), 7)
+    number = rng.randint(1, 4999)
+    street = rng.choice(_STREETS)
+    return {
+        "results": [{
+            "address_components": [
+                {"long_name": str(number), "short_name": str(number), "types": ["street_number"]},
+                {"long_name": street, "short_name": street, "types": ["route"]},
+                {"long_name": "Mountain View", "short_name": "Mountain View",
+                 "types": ["locality", "political"]},
+                {"long_name": "Santa Clara County", "short_name": "Santa Clara County",
+                 "types": ["administrative_area_level_2", "political"]},
+                {"long_name": "California", "short_name": "CA",
+                 "types": ["administrative_area_level_1", "political"]},
+                {"long_name": "United States", "short_name": "US", "types": ["country", "political"]},
+                {"long_name": str(94000 + rng.randint(0, 999)), "short_name": str(94000 + rng.randint(0, 999)),
+                 "types": ["postal_code"]},
+            ],
+            "formatted_address": f"{number} {street}, Mountain View, CA, USA",
+            "geometry": {
+                "location": {"lat": lat, "lng": lng},
+                "location_type": "ROOFTOP",
+                "viewport": _viewport(lat, lng),
+            },
+            "place_id": _place_id(rng),
+            "plus_code": {"compound_code": "CWC8+W5 Mountain View, CA, USA", "global_code": "849VCWC8+W5"},
+            "types": ["street_address"],
+        }],
+        "status": "OK",
+    }
+
+
+def places_payload(config, query, location, radius, page):
+    """
+    Builds one page of a Places search response around a location. An empty
+    query, as sent by a Nearby Search without keyword, returns a mix of
+    place categories.
+    """
+    lat, lng = (float(v) for v in location.split(","))
+    radius = min(float(radius or 5000), 50_000)
+    query = query.strip().lower()
+    # Results depend on a ~100 m grid cell so nearby searches overlap realistically.
+    rng = _rng(config.seed, "places", query, round(lat, 3), round(lng, 3), page)
+    results = []
+    for i in range(config.page_size):
+        category = query or rng.choice(sorted(_PLACE_TYPES))
+        types = _PLACE_TYPES.get(category, [category.replace(" ", "_"), "point_of_interest", "establishment"])
+        plat, plng = _offset(lat, lng, radius * math.sqrt(rng.random()), rng.uniform(0, 2 * math.pi))
+        name = f"{category.title()} {page * config.page_size + i + 1}"
+        results.append({
+            "business_status": "OPERATIONAL",
+            "formatted_address": f"{rng.randint(1, 4999)} {rng.choice(_STREETS)}, Mountain View, CA 94043, USA",
+            "geometry": {"location": {"lat": plat, "lng": plng}, "viewport": _viewport(plat, plng)},
+            "icon": "https://maps.gstatic.com/mapfiles/place_api/icons/v1/png_71/generic_business-71.png",
+            "icon_background_color": "#7B9EB0",
+            "icon_mask_base_uri": "https://maps.gstatic.com/mapfiles/place_api/icons/v2/generic_pinlet",
+            "name": name,
+            "opening_hours": {"open_now": rng.random() < 0.7},
+            "photos": [{
+                "height": 3024,
+                "html_attributions": ['<a href="https://maps.google.com/maps/contrib/1">A Google User</a>'],
+                "photo_reference": "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(160)),
+                "width": 4032,
+            }],
+            "place_id": _place_id(rng),
+            "plus_code": {"compound_code": "CWC8+W5 Mountain View, CA", "global_code": "849VCWC8+W5"},
+            "rating": round(rng.uniform(2.5, 5.0), 1),
+            "reference": _place_id(rng),
+            "types": types,
+            "user_ratings_total": rng.randint(0, 5000),
+        })
+    payload = {"html_attributions": [], "results": results, "status": "OK"}
+    if page + 1 < config.max_pages:
+        token = json.dumps({"q": query, "l": location, "r": radius, "p": page + 1})
+        payload["next_page_token"] = base64.urlsafe_b64encode(token.encode()).decode()
+    return payload
+
+
+def weather_payload(config, lat, lng):
+    """
+    Builds a wttr.in j1 document for a location.
+    """
+    rng = _rng(config.seed, "weather", round(lat, 2), round(lng, 2), int(time.time() // 900))
+    base_temp = rng.randint(5, 30)
+
+    def condition(temp):
+        code, desc = rng.choice(_WEATHER_CODES)
+        wind = rng.randint(0, 40)
+        degree = rng.randint(0, 359)
+        return {
+            "FeelsLikeC": str(temp - rng.randint(0, 3)), "FeelsLikeF": str(int(temp * 1.8 + 32)),
+            "cloudcover": str(rng.randint(0, 100)), "humidity": str(rng.randint(20, 95)),
+            "precipInches": "0.0", "precipMM": f"{rng.random():.1f}",
+            "pressure": str(rng.randint(995, 1030)), "pressureInches": "30",
+            "temp_C": str(temp), "temp_F": str(int(temp * 1.8 + 32)), "uvIndex": str(rng.randint(0, 9)),
+            "visibility": "10", "visibilityMiles": "6", "weatherCode": code,
+            "weatherDesc": [{"value": desc}], "weatherIconUrl": [{"value": ""}],
+            "winddir16Point": _WIND_POINTS[degree * 16 // 360], "winddirDegree": str(degree),
+            "windspeedKmph": str(wind), "windspeedMiles": str(int(wind / 1.609)),
+        }
+
+    current = condition(base_temp)
+    current.update(localObsDateTime=time.strftime("%Y-%m-%d %I:%M %p"), observation_time="12:00 PM")
+    days = []
+    for day in range(3):
+        hourly = []
+        for slot in range(8):
+            hour = condition(base_temp + rng.randint(-5, 5))
+            hour.update({
+                "time": str(slot * 300), "DewPointC": str(rng.randint(0, 15)), "DewPointF": "50",
+                "HeatIndexC": hour["temp_C"], "HeatIndexF": hour["temp_F"],
+                "WindChillC": hour["temp_C"], "WindChillF": hour["temp_F"],
+                "WindGustKmph": str(rng.randint(0, 60)), "WindGustMiles": "10",
+                "chanceofrain": str(rng.randint(0, 100)), "chanceofsnow": "0",
+                "chanceofsunshine": str(rng.randint(0, 100)), "chanceofthunder": "0",
+                "chanceoffog": "0", "chanceoffrost": "0", "chanceofhightemp": "0",
+                "chanceofovercast": str(rng.randint(0, 100)), "chanceofremdry": "0",
+                "chanceofwindy": "0", "diffRad": f"{rng.uniform(0, 300):.1f}",
+                "shortRad": f"{rng.uniform(0, 900):.1f}",
+            })
+            hourly.append(hour)
+        days.append({
+            "astronomy": [{"moon_illumination": str(rng.randint(0, 100)), "moon_phase": "Waxing Gibbous",
+                           "moonrise": "03:12 PM", "moonset": "02:47 AM",
+                           "sunrise": "07:05 AM", "sunset": "06:31 PM"}],
+            "avgtempC": str(base_temp), "avgtempF": str(int(base_temp * 1.8 + 32)),
+            "date": time.strftime("%Y-%m-%d", time.localtime(time.time() + day * 86400)),
+            "hourly": hourly,
+            "maxtempC": str(base_temp + 5), "maxtempF": str(int((base_temp + 5) * 1.8 + 32)),
+            "mintempC": str(base_temp - 5), "mintempF": str(int((base_temp - 5) * 1.8 + 32)),
+            "sunHour": f"{rng.uniform(4, 12):.1f}", "totalSnow_cm": "0.0", "uvIndex": str(rng.randint(0, 9)),
+        })
+    return {
+        "current_condition": [current],
+        "nearest_area": [{
+            "areaName": [{"value": "Mountain View"}], "country": [{"value": "United States of America"}],
+            "latitude": f"{lat:.3f}", "longitude": f"{lng:.3f}", "population": "74066",
+            "region": [{"value": "California"}], "weatherUrl": [{"value": ""}],
+        }],
+        "request": [{"query": f"Lat {lat:.2f} and Lon {lng:.2f}", "type": "LatLon"}],
+        "weather": days,
+    }
+
+
+# --- Server ---
+
+class FakeMapsServer:
+    """
+    A threaded HTTP server answering the fake endpoints with the configured
+    latency, error and throttling behaviour. Counts every request by endpoint.
+    """
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeBackendConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._windows = defaultdict(deque)
+        self._counts = defaultdict(lambda: defaultdict(int))
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Serves requests on a background thread.
+
+        Returns:
+            FakeMapsServer: self, for chaining.
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fakemaps", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """
+        Serves requests on the calling thread until interrupted.
+        """
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        """
+        Returns:
+            dict: Per endpoint, the number of requests, errors and throttled requests.
+        """
+        with self._stats_lock:
+            return {endpoint: dict(counts) for endpoint, counts in self._counts.items()}
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._counts.clear()
+
+    def _count(self, endpoint, outcome):
+        with self._stats_lock:
+            self._counts[endpoint]["requests"] += 1
+            if outcome != "ok":
+                self._counts[endpoint][outcome] += 1
+
+    def _decide(self, endpoint):
+        """
+        Sleeps for the sampled latency and decides the outcome of one request:
+        'ok', 'error' or 'throttled'.
+        """
+        profile = self.config.profiles[endpoint]
+        with self._rng_lock:
+            latency = profile.sample_latency(self._rng)
+            failed = self._rng.random() < profile.error_rate
+        outcome = "error" if failed else "ok"
+        if profile.qps:
+            now = time.monotonic()
+            with self._stats_lock:
+                window = self._windows[endpoint]
+                while window and now - window[0] >= 1.0:
+                    window.popleft()
+                if len(window) >= profile.qps:
+                    outcome = "throttled"
+                else:
+                    window.append(now)
+        time.sleep(latency)
+        self._count(endpoint, outcome)
+        return outcome
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                config = server.config
+
+                if parsed.path == STATS_PATH:
+                    return self._send(200, server.stats())
+
+                if parsed.path == GEOCODE_PATH:
+                    outcome = server._decide("geocode")
+                    if outcome != "ok":
+                        return self._send_google_failure(outcome)
+                    return self._send(200, geocode_payload(config, query.get("address", "")))
+
+                if parsed.path in (PLACES_PATH, NEARBY_PATH):
+                    outcome = server._decide("places")
+                    if outcome != "ok":
+                        return self._send_google_failure(outcome)
+                    if "pagetoken" in query:
+                        token = json.loads(base64.urlsafe_b64decode(query["pagetoken"].encode()))
+                        return self._send(200, places_payload(config, token["q"], token["l"], token["r"], token["p"]))
+                    search = query.get("query", "") if parsed.path == PLACES_PATH else query.get("keyword", "")
+                    return self._send(200, places_payload(
+                        config, search, query.get("location", "0,0"), query.get("radius"), 0
+                    ))
+
+                try:
+                    lat, lng = (float(v) for v in unquote(parsed.path.strip("/")).split(","))
+                except ValueError:
+                    return self._send(404, {"error": f"unknown path {parsed.path}"})
+                outcome = server._decide("weather")
+                if outcome == "throttled":
+                    return self._send(429, {"error": "Too Many Requests"})
+                if outcome == "error":
+                    return self._send(503, {"error": "Service Unavailable"})
+                return self._send(200, weather_payload(config, lat, lng))
+
+            def _send_google_failure(self, outcome):
+                if outcome == "throttled":
+                    return self._send(200, {"results": [], "status": "OVER_QUERY_LIMIT",
+                                            "error_message": "You have exceeded your rate-limit for this API."})
+                return self._send(500, {"results": [], "status": "UNKNOWN_ERROR"})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def start_fake_server(config=None, host="127.0.0.1", port=0):
+    """
+    Starts a FakeMapsServer on a background thread.
+
+    Returns:
+        FakeMapsServer: The running server; its `url` is the base URL to use.
+    """
+    return FakeMapsServer(config, host, port).start()
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for Google Maps and wttr.in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=None,
+                        help="Median latency for every endpoint (default: per-endpoint profile)")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Log-normal latency spread")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--qps", type=float, default=None, help="Per-endpoint QPS before throttling")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeBackendConfig(seed=args.seed)
+    for profile in config.profiles.values():
+        if args.latency_ms is not None:
+            profile.median_ms = args.latency_ms
+        profile.sigma = args.sigma
+        profile.error_rate = args.error_rate
+        profile.qps = args.qps
+
+    server = FakeMapsServer(config, args.host, args.port)
+    print(f"Fake Maps / wttr.in backend listening on {server.url}")
+    print("  export GOOGLE_MAPS_API_KEY=AIzaFakeKey")
+    print(f"  export GOOGLE_MAPS_BASE_URL={server.url}")
+    print(f"  export WTTR_BASE_URL={server.url}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
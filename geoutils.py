@@ -0,0 +1,200 @@
+import math
+
+import numpy as np
+
+# Mean Earth radius in meters, as used by the haversine formula.
+EARTH_RADIUS_M = 6_371_008.8
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH_INDEX = {c: i for i, c in enumerate(_GEOHASH_BASE32)}
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance between two points.
+
+    Args:
+        lat1, lng1 (float): The first point in degrees.
+        lat2, lng2 (float): The second point in degrees.
+
+    Returns:
+        float: The distance in meters.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_matrix_m(origins, points):
+    """
+    Great-circle distances from every origin to every point in one vectorized pass.
+
+    Args:
+        origins (array-like): Shape (n, 2) of (lat, lng) in degrees.
+        points (array-like): Shape (m, 2) of (lat, lng) in degrees.
+
+    Returns:
+        numpy.ndarray: Shape (n, m) of distances in meters. Points with NaN
+        coordinates get NaN distances.
+    """
+    origins = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    points = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat1, lng1 = origins[:, :1], origins[:, 1:]
+    lat2, lng2 = points[:, 0], points[:, 1]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def rank_by_distance(origins, points, radius=None, top_k=None):
+    """
+    Orders points by distance from each origin, optionally keeping only those
+    within `radius` and the nearest `top_k`.
+
+    Args:
+        origins (array-like): Shape (n, 2) of (lat, lng) in degrees.
+        points (array-like): Shape (m, 2) of (lat, lng) in degrees.
+        radius (float): Drop points farther than this many meters, or None.
+        top_k (int): Keep at most this many points per origin, or None.
+
+    Returns:
+        list: For each origin, a tuple (indices, distances) of NumPy arrays,
+        nearest first. Points without coordinates are ranked last.
+    """
+    distances = haversine_matrix_m(origins, points)
+    # NaN distances (missing coordinates) sort after every real distance.
+    order = np.argsort(distances, axis=1, kind="stable")
+    ranked = []
+    for row, row_order in zip(distances, order):
+        if radius is not None:
+            row_order = row_order[row[row_order] <= radius]
+        if top_k is not None:
+            row_order = row_order[:top_k]
+        ranked.append((row_order, row[row_order]))
+    return ranked
+
+
+def geohash_encode(lat, lng, precision=7):
+    """
+    Encodes a point as a geohash string.
+
+    Args:
+        lat, lng (float): The point in degrees.
+        precision (int): Number of characters. 7 gives cells of ~150 m.
+
+    Returns:
+        str: The geohash of the cell containing the point.
+    """
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                value = (value << 1) | 1
+                lng_lo = mid
+            else:
+                value <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = (value << 1) | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash):
+    """
+    Decodes a geohash into the bounding box of its cell.
+
+    Args:
+        geohash (str): The geohash to decode.
+
+    Returns:
+        tuple: (lat_lo, lat_hi, lng_lo, lng_hi) in degrees.
+    """
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = _GEOHASH_INDEX[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                if bit:
+                    lng_lo = mid
+                else:
+                    lng_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+
+def geohash_center(geohash):
+    """
+    Returns:
+        dict: The center of the geohash cell as a dictionary with 'lat' and 'lng'.
+    """
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bounds(geohash)
+    return {"lat": (lat_lo + lat_hi) / 2, "lng": (lng_lo + lng_hi) / 2}
+
+
+def geohash_half_diagonal_m(geohash):
+    """
+    Returns:
+        float: Distance in meters from the center of the cell to its farthest corner.
+    """
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bounds(geohash)
+    center = geohash_center(geohash)
+    # The corner nearest the equator is the widest one.
+    corner_lat = lat_lo if abs(lat_lo) < abs(lat_hi) else lat_hi
+    return haversine_m(center["lat"], center["lng"], corner_lat, lng_hi)
+
+
+def cluster_locations(locations, precision=6):
+    """
+    Groups nearby locations by the geohash cell they fall in.
+
+    Args:
+        locations (list): Dictionaries with 'lat' and 'lng' keys.
+        precision (int): Geohash length of a cluster. 6 gives cells of
+            ~1.2 x 0.6 km, 5 of ~5 x 5 km.
+
+    Returns:
+        list: One (center, spread_m, members) tuple per cluster: the centroid
+        as a dictionary with 'lat' and 'lng', the distance in meters from it
+        to the farthest member, and the indices of the members in `locations`.
+    """
+    groups = {}
+    for i, location in enumerate(locations):
+        groups.setdefault(geohash_encode(location["lat"], location["lng"], precision), []).append(i)
+
+    clusters = []
+    for members in groups.values():
+        center = {
+            "lat": sum(locations[i]["lat"] for i in members) / len(members),
+            "lng": sum(locations[i]["lng"] for i in members) / len(members),
+        }
+        spread = max(
+            haversine_m(center["lat"], center["lng"], locations[i]["lat"], locations[i]["lng"]) for i in members
+        )
+        clusters.append((center, spread, members))
+    return clusters
@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from geoutils import EARTH_RADIUS_M
+
+# Columns every POI dataset must provide; 'address' is optional.
+POI_COLUMNS = ("name", "category", "lat", "lng")
+
+
+def normalize_category(category):
+    """
+    Folds a category name so 'Grocery_Store' and 'grocery store' match.
+    """
+    return " ".join(str(category).lower().replace("_", " ").split())
+
+
+class PoiIndex:
+    """
+    An in-memory spatial index of points of interest, with one haversine
+    BallTree per category, that answers radius queries without network calls.
+
+    Args:
+        frame (pandas.DataFrame): One row per POI with 'name', 'category',
+            'lat' and 'lng' columns and an optional 'address' column.
+        leaf_size (int): BallTree leaf size.
+    """
+    def __init__(self, frame, leaf_size=40):
+        missing = [column for column in POI_COLUMNS if column not in frame.columns]
+        if missing:
+            raise ValueError(f"POI dataset is missing columns: {', '.join(missing)}")
+
+        frame = frame.dropna(subset=["lat", "lng"])
+        categories = frame["category"].map(normalize_category)
+        addresses = frame["address"] if "address" in frame.columns else pd.Series(None, index=frame.index)
+        self._trees = {}
+        self._places = {}
+        for category, group in frame.groupby(categories, sort=False):
+            coordinates = np.radians(group[["lat", "lng"]].to_numpy(dtype=float))
+            self._trees[category] = BallTree(coordinates, leaf_size=leaf_size, metric="haversine")
+            self._places[category] = [
+                {"name": name, "address": None if pd.isna(address) else address}
+                for name, address in zip(group["name"], addresses.loc[group.index])
+            ]
+        self.size = len(frame)
+
+    @classmethod
+    def from_file(cls, path, leaf_size=40):
+        """
+        Loads a POI dataset from a '.csv' or '.parquet' file.
+        """
+        if os.path.splitext(path)[1].lower() in (".parquet", ".pq"):
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path)
+        return cls(frame, leaf_size=leaf_size)
+
+    def categories(self):
+        """
+        Returns:
+            list: The (normalized) categories present in the dataset.
+        """
+        return list(self._trees)
+
+    def has_category(self, category):
+        return normalize_category(category) in self._trees
+
+    def query(self, location, category, radius=5000, top_k=None):
+        """
+        Finds the POIs of a category within `radius` meters of a location.
+
+        Args:
+            location (dict): A dictionary with 'lat' and 'lng' keys.
+            category (str): The POI category, e.g. 'school'.
+            radius (float): The search radius in meters.
+            top_k (int): Return only the nearest `top_k` places, or None for all.
+
+        Returns:
+            list: The matching places with their names, addresses and distance
+            in meters ('distance_m'), nearest first.
+        """
+        return self.query_batch([location], category, radius, top_k)[0]
+
+    def query_batch(self, locations, category, radius=5000, top_k=None):
+        """
+        Runs the same radius query for many locations in one BallTree call.
+
+        Args:
+            locations (list): Dictionaries with 'lat' and 'lng' keys.
+            category (str): The POI category, e.g. 'school'.
+            radius (float): The search radius in meters.
+            top_k (int): Keep only the nearest `top_k` places per location.
+
+        Returns:
+            list: For each location, in input order, its matching places
+            nearest first. Unknown categories give empty lists.
+        """
+        category = normalize_category(category)
+        tree = self._trees.get(category)
+        if tree is None or not locations:
+            return [[] for _ in locations]
+
+        points = np.radians([[location["lat"], location["lng"]] for location in locations])
+        indices, distances = tree.query_radius(points, r=radius / EARTH_RADIUS_M, return_distance=True,
+                                               sort_results=True)
+        places = self._places[category]
+        return [
+            [
+                dict(places[i], distance_m=round(d * EARTH_RADIUS_M, 1))
+                for i, d in zip(hits[:top_k].tolist(), angles[:top_k].tolist())
+            ]
+            for hits, angles in zip(indices, distances)
+        ]
+
+
+_default_poi_index = None
+
+
+def default_poi_index():
+    """
+    Returns the process-wide POI index loaded from POI_INDEX_PATH, or None
+    when that variable is unset and amenities come from the Places API.
+    """
+    global _default_poi_index
+    path = os.getenv("POI_INDEX_PATH")
+    if not path:
+        return None
+    if _default_poi_index is None:
+        _default_poi_index = PoiIndex.from_file(path)
+    return _default_poi_index
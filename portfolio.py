@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from agentbus import AgentBus
+from agentcache import dedupe_addresses
+from realestate import AGENTS, AMENITY_TYPES, fetch_amenities
+
+# Properties analyzed at the same time in batch mode.
+DEFAULT_BATCH_CONCURRENCY = 16
+
+# Rows read, analyzed and written per step.
+DEFAULT_CHUNK_SIZE = 500
+
+_PLACE_TYPE = pa.struct([("name", pa.string()), ("address", pa.string()), ("distance_m", pa.float64())])
+
+
+def _column(place_type):
+    return place_type.replace(" ", "_")
+
+
+def _output_schema(place_types):
+    fields = [
+        ("address", pa.string()),
+        ("lat", pa.float64()),
+        ("lng", pa.float64()),
+        ("status", pa.string()),
+    ]
+    for place_type in place_types:
+        fields.append((f"{_column(place_type)}_count", pa.int64()))
+        fields.append((_column(place_type), pa.list_(_PLACE_TYPE)))
+    return pa.schema(fields)
+
+
+# --- Input / Output ---
+
+def read_addresses(path, column="address", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams addresses from a CSV or Parquet file without loading it whole.
+
+    Args:
+        path (str): A '.csv' or '.parquet' file.
+        column (str): The column holding the addresses.
+        chunk_size (int): Number of addresses per yielded chunk.
+
+    Yields:
+        list: The next chunk of addresses.
+    """
+    if os.path.splitext(path)[1].lower() in (".parquet", ".pq"):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=[column]):
+            yield [str(a) for a in batch.column(0).to_pylist() if a]
+    else:
+        for frame in pd.read_csv(path, usecols=[column], chunksize=chunk_size, dtype=str):
+            yield frame[column].dropna().tolist()
+
+
+class _ParquetSink:
+    def __init__(self, path, schema):
+        self._writer = pq.ParquetWriter(path, schema)
+        self._schema = schema
+
+    def write(self, rows):
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class _CsvSink:
+    def __init__(self, path, schema):
+        self._path = path
+        self._columns = schema.names
+        self._list_columns = [f.name for f in schema if pa.types.is_list(f.type)]
+        self._header = True
+
+    def write(self, rows):
+        frame = pd.DataFrame(rows, columns=self._columns)
+        for column in self._list_columns:
+            frame[column] = frame[column].map(json.dumps)
+        frame.to_csv(self._path, mode="w" if self._header else "a", header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        pass
+
+
+def _open_sink(path, schema):
+    if os.path.splitext(path)[1].lower() == ".csv":
+        return _CsvSink(path, schema)
+    return _ParquetSink(path, schema)
+
+
+# --- Batch Orchestrator ---
+
+def _analyze_row(amenities_agent, address, coordinates, place_types, multi_category):
+    """
+    Looks up the amenities of one geocoded address. The amenity lookups run
+    one after another here; concurrency comes from analyzing many rows at once.
+    """
+    row = {"address": address, "lat": None, "lng": None, "status": "not_found"}
+    if coordinates:
+        row.update(lat=coordinates["lat"], lng=coordinates["lng"], status="ok")
+        amenities = fetch_amenities(amenities_agent, coordinates, place_types, max_concurrency=1,
+                                    multi_category=multi_category)
+    else:
+        amenities = {place_type: [] for place_type in place_types}
+    _set_amenities(row, amenities)
+    return row
+
+
+def _set_amenities(row, amenities):
+    for place_type, places in amenities.items():
+        row[f"{_column(place_type)}_count"] = len(places)
+        row[_column(place_type)] = places
+
+
+def _analyze_chunk(amenities_agent, addresses, locations, place_types, cluster_precision):
+    """
+    Looks up each amenity type for a whole chunk of geocoded addresses with
+    one batch query: against the offline POI index when there is one,
+    otherwise with one Places search per cluster of nearby properties.
+    """
+    rows = []
+    for address, coordinates in zip(addresses, locations):
+        row = {"address": address, "lat": None, "lng": None, "status": "not_found"}
+        if coordinates:
+            row.update(lat=coordinates["lat"], lng=coordinates["lng"], status="ok")
+        rows.append((row, coordinates))
+
+    located = [(row, coordinates) for row, coordinates in rows if coordinates]
+    for place_type in place_types:
+        batch = amenities_agent.find_nearby_places_batch([c for _, c in located], place_type,
+                                                         cluster_precision=cluster_precision)
+        for (row, _), places in zip(located, batch):
+            row[f"{_column(place_type)}_count"] = len(places)
+            row[_column(place_type)] = places
+    for row, coordinates in rows:
+        if not coordinates:
+            _set_amenities(row, {place_type: [] for place_type in place_types})
+    return [row for row, _ in rows]
+
+
+def analyze_portfolio(input_path, output_path, address_column="address",
+                      place_types=AMENITY_TYPES, max_concurrency=DEFAULT_BATCH_CONCURRENCY,
+                      chunk_size=DEFAULT_CHUNK_SIZE, multi_category=False, cluster_precision=None,
+                      agents=AGENTS):
+    """
+    Analyzes every address in a CSV/Parquet file and streams the results to a
+    Parquet (or CSV) file as each chunk completes.
+
+    Args:
+        input_path (str): The '.csv' or '.parquet' file of addresses.
+        output_path (str): The output file; '.csv' writes CSV, anything else Parquet.
+        address_column (str): The input column holding the addresses.
+        place_types (iterable): The amenity types to look up for each property.
+        max_concurrency (int): Maximum number of properties analyzed at once.
+        chunk_size (int): Rows read, analyzed and written per step.
+        multi_category (bool): Look up all amenity types with one Nearby
+            Search per property instead of one text search per type.
+        cluster_precision (int): Group the properties of each chunk into
+            geohash cells of this length and search once per cell and type
+            instead of once per property, or None to search per property.
+        agents (AgentRegistry): Where the agents come from; an AgentBus runs
+            them in worker processes.
+
+    Returns:
+        dict: 'rows', 'seconds' and 'rows_per_sec' for the whole run, and
+        'dedup_ratio', the share of geocode calls saved by address dedup.
+    """
+    place_types = list(place_types)
+    location_agent = agents.get("location")
+    amenities_agent = agents.get("amenities")
+
+    # Counted here rather than from the agent, which may be one of several
+    # worker processes.
+    addresses_seen = unique_seen = 0
+    sink = _open_sink(output_path, _output_schema(place_types))
+    rows_done = 0
+    started = time.perf_counter()
+    # With an offline POI index or clustering, amenities are looked up per
+    # chunk rather than per row.
+    batched = amenities_agent.poi_index is not None or cluster_precision is not None
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            for addresses in read_addresses(input_path, address_column, chunk_size):
+                # Near-duplicate addresses in the chunk are geocoded once.
+                locations = location_agent.get_coordinates_batch(addresses, max_concurrency)
+                addresses_seen += len(addresses)
+                unique_seen += len(dedupe_addresses(addresses)[1])
+                if batched:
+                    rows = _analyze_chunk(amenities_agent, addresses, locations, place_types, cluster_precision)
+                else:
+                    rows = list(executor.map(
+                        lambda item: _analyze_row(amenities_agent, item[0], item[1], place_types, multi_category),
+                        zip(addresses, locations),
+                    ))
+                if rows:
+                    sink.write(rows)
+                rows_done += len(rows)
+                elapsed = time.perf_counter() - started
+                print(f"Portfolio: {rows_done} rows in {elapsed:.1f}s "
+                      f"({rows_done / elapsed:.1f} rows/sec).")
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows_done,
+        "seconds": elapsed,
+        "rows_per_sec": rows_done / elapsed if elapsed else 0.0,
+        "dedup_ratio": 1 - unique_seen / addresses_seen if addresses_seen else 0.0,
+    }
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch property analysis over a CSV/Parquet file.")
+    parser.add_argument("input", help="CSV or Parquet file of addresses")
+    parser.add_argument("output", help="Output file (.parquet or .csv)")
+    parser.add_argument("--column", default="address", help="Column holding the addresses")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--multi-category", action="store_true",
+                        help="Run one Nearby Search per property instead of one text search per amenity type")
+    parser.add_argument("--cluster-precision", type=int, default=None,
+                        help="Search once per geohash cell of this length instead of per property (e.g. 6)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Run each agent type in this many worker processes")
+    args = parser.parse_args()
+
+    options = dict(max_concurrency=args.concurrency, chunk_size=args.chunk_size,
+                   multi_category=args.multi_category, cluster_precision=args.cluster_precision)
+    if args.processes:
+        with AgentBus.from_registry(AGENTS, workers=args.processes) as bus:
+            summary = analyze_portfolio(args.input, args.output, args.column, agents=bus, **options)
+    else:
+        summary = analyze_portfolio(args.input, args.output, args.column, **options)
+    print("\n--- Portfolio Analysis Complete ---")
+    print(f"{summary['rows']} rows in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_sec']:.1f} rows/sec).")
+    print(f"Address dedup saved {summary['dedup_ratio']:.0%} of geocode calls.")
@@ -0,0 +1,255 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import deadline
+
+# Queries per second allowed for each upstream API. Override with AGENT_QPS_<API>,
+# e.g. AGENT_QPS_PLACES=5.
+DEFAULT_QPS = {
+    "geocode": 50.0,
+    "places": 10.0,
+    "weather": 5.0,
+}
+
+# Starting and maximum number of in-flight calls per API.
+DEFAULT_MAX_CONCURRENCY = 32
+
+
+def is_throttled(exc):
+    """
+    True if an exception raised by an upstream call means "slow down".
+
+    Covers the googlemaps OVER_QUERY_LIMIT / RESOURCE_EXHAUSTED API errors and
+    HTTP 429 responses from googlemaps or requests.
+    """
+    if getattr(exc, "status", None) in ("OVER_QUERY_LIMIT", "RESOURCE_EXHAUSTED"):
+        return True
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that refills at `rate` tokens per second and
+    holds at most `burst` tokens.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available and takes it.
+
+        Raises:
+            deadline.DeadlineExceeded: If the current deadline passes first.
+        """
+        while True:
+            deadline.check()
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            left = deadline.remaining()
+            time.sleep(wait if left is None else min(wait, left))
+
+
+class AdaptiveConcurrency:
+    """
+    A concurrency limit adjusted AIMD style: it grows by one slot after a full
+    window of successful calls and is halved when a call is throttled. A
+    burst of throttled calls counts as one congestion event: only calls that
+    started after the last decrease can halve the limit again.
+    """
+    def __init__(self, initial=DEFAULT_MAX_CONCURRENCY, minimum=1, maximum=DEFAULT_MAX_CONCURRENCY):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self._in_flight = 0
+        # Bumped on every decrease; calls remember the epoch they started in.
+        self._epoch = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits for a free slot.
+
+        Returns:
+            int: The current epoch, to pass to on_throttle.
+        """
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                deadline.check()
+                self._cond.wait(deadline.remaining())
+            self._in_flight += 1
+            return self._epoch
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            if self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self._cond.notify()
+
+    def on_throttle(self, epoch):
+        """
+        Halves the limit, unless the throttled call started before the last
+        decrease (it belongs to a congestion event already handled).
+        """
+        with self._cond:
+            if epoch != self._epoch:
+                return
+            self._epoch += 1
+            self.limit = max(self.minimum, self.limit / 2)
+
+
+class ApiLimiter:
+    """
+    Limits calls to one upstream API to a fixed QPS and an adaptive number of
+    concurrent calls, retrying throttled calls with jittered backoff.
+    """
+    def __init__(self, name, qps, max_concurrency=DEFAULT_MAX_CONCURRENCY, retries=3, backoff=0.5):
+        self.name = name
+        self.bucket = TokenBucket(qps)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, maximum=max_concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.calls = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        """
+        Holds a concurrency slot and a QPS token for the duration of one call,
+        yielding the concurrency epoch the call started in.
+        """
+        epoch = self.concurrency.acquire()
+        try:
+            self.bucket.acquire()
+            yield epoch
+        finally:
+            self.concurrency.release()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls `func` under the limits. Throttled calls back the concurrency off
+        and are retried up to `retries` times, unless the current deadline
+        would pass first; other errors propagate unchanged.
+
+        Returns:
+            The return value of `func`.
+        """
+        for attempt in range(self.retries + 1):
+            with self.slot() as epoch:
+                with self._lock:
+                    self.calls += 1
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    if not is_throttled(e):
+                        raise
+                    with self._lock:
+                        self.throttled += 1
+                    self.concurrency.on_throttle(epoch)
+                    if attempt == self.retries:
+                        raise
+                else:
+                    self.concurrency.on_success()
+                    return result
+            delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            left = deadline.remaining()
+            if left is not None and left <= delay:
+                # The retry could not start before the deadline anyway.
+                raise deadline.DeadlineExceeded(f"{self.name}: no time left to retry")
+            time.sleep(delay)
+
+    def stats(self):
+        return {
+            "qps": self.bucket.rate,
+            "concurrency_limit": int(self.concurrency.limit),
+            "calls": self.calls,
+            "throttled": self.throttled,
+        }
+
+
+class RateLimiter:
+    """
+    The set of per-API limiters shared by every agent in the process.
+    """
+    def __init__(self, qps=None, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.qps = dict(DEFAULT_QPS)
+        for api in self.qps:
+            override = os.getenv(f"AGENT_QPS_{api.upper()}")
+            if override:
+                self.qps[api] = float(override)
+        self.qps.update(qps or {})
+        self.max_concurrency = max_concurrency
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, api):
+        """
+        Returns:
+            ApiLimiter: The limiter for `api`, created on first use.
+        """
+        with self._lock:
+            limiter = self._limiters.get(api)
+            if limiter is None:
+                qps = self.qps.get(api, min(DEFAULT_QPS.values()))
+                limiter = ApiLimiter(api, qps, self.max_concurrency)
+                self._limiters[api] = limiter
+            return limiter
+
+    def call(self, api, func, *args, **kwargs):
+        """
+        Calls `func` under the limits of `api`. See ApiLimiter.call.
+        """
+        return self.limiter(api).call(func, *args, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {api: limiter.stats() for api, limiter in self._limiters.items()}
+
+
+_default_rate_limiter = RateLimiter()
+
+
+def default_rate_limiter():
+    """
+    Returns the process-wide RateLimiter shared by every agent.
+    """
+    return _default_rate_limiter
+
+
+def configure_default_rate_limiter(qps=None, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    Replaces the process-wide RateLimiter. Agents created afterwards use the
+    new limits.
+
+    Args:
+        qps (dict): Queries per second per API, overriding DEFAULT_QPS.
+        max_concurrency (int): Maximum number of in-flight calls per API.
+
+    Returns:
+        RateLimiter: The new process-wide limiter.
+    """
+    global _default_rate_limiter
+    _default_rate_limiter = RateLimiter(qps, max_concurrency)
+    return _default_rate_limiter
@@ -1,7 +1,46 @@
+import math
 import os
-import googlemaps
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
 
+from agentcache import default_geocode_cache, default_places_cache, dedupe_addresses, normalize_address
+from agentgraph import AgentGraph
+from agenthttp import get_gmaps_client
+from agentplaces import iter_places
+from agentregistry import AgentRegistry
+from deadline import carry
+from geoutils import cluster_locations, rank_by_distance
+from poiindex import default_poi_index
+from ratelimit import default_rate_limiter
+from singleflight import default_single_flight
+from tracing import trace_span
+
+# The amenity categories looked up for every property, in presentation order.
+AMENITY_TYPES = ("school", "park", "grocery store")
+
+# Places API `types` that count towards each amenity category when one
+# Nearby Search result set is classified locally.
+CATEGORY_TYPES = {
+    "school": {"school", "primary_school", "secondary_school", "university"},
+    "park": {"park"},
+    "grocery store": {"grocery_or_supermarket", "supermarket"},
+}
+
+# Cache key under which unfiltered Nearby Search results are stored.
+NEARBY_CACHE_KEY = "*nearby*"
+
+# Seconds analyze_property may take end to end, and the share of it the
+# geocoding step may use; the amenity lookups get whatever is left.
+DEFAULT_DEADLINE = 20.0
+GEOCODE_SHARE = 0.4
+
+# Upper bound on how many amenity lookups run at the same time.
+DEFAULT_MAX_CONCURRENCY = 3
+
+# Largest radius the Places API accepts, in meters.
+MAX_SEARCH_RADIUS = 50_000
+
 # --- Agent Definitions ---
 
 class LocationAgent:
@@ -9,8 +48,10 @@ class LocationAgent:
     A specialized agent that converts a street address to geographical coordinates
     using the Google Maps Geocoding API.
     """
-    def __init__(self, name="Location Agent"):
+    def __init__(self, name="Location Agent", cache=None):
         self.name = name
+        # Optional GeocodeCache consulted before calling the Geocoding API.
+        self.cache = cache
         # IMPORTANT: Paste your Google Maps API key directly here.
         # This is a fallback in case the environment variable is not set.
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY", "key")
@@ -18,8 +59,17 @@ class LocationAgent:
         if self.api_key == "YOUR_API_KEY_HERE" or not self.api_key:
             raise ValueError("GOOGLE_MAPS_API_KEY not set. Please paste your key in the code.")
             
-        self.gmaps = googlemaps.Client(key=self.api_key)
-        print(f"{self.name} initialized.")
+        # All agents share one client and its pooled keep-alive connections.
+        # Resolving it here reports an invalid key when the agent is built.
+        self.gmaps = get_gmaps_client(self.api_key)
+        # Shared QPS / adaptive concurrency limits for the Google APIs.
+        self.rate_limiter = default_rate_limiter()
+        # Identical concurrent requests share one upstream call.
+        self.flights = default_single_flight()
+        # Addresses seen by get_coordinates_batch, and how many were distinct.
+        self.batch_addresses = 0
+        self.batch_unique = 0
+        self._batch_lock = threading.Lock()
 
     def get_coordinates(self, address):
         """
@@ -31,22 +81,80 @@ class LocationAgent:
         Returns:
             dict: A dictionary with 'lat' and 'lng' of the location, or None.
         """
-        print(f"\n{self.name}: Received request to geocode address: '{address}'.")
-        try:
-            # Geocoding the address
-            geocode_result = self.gmaps.geocode(address)
-            
-            if not geocode_result:
-                print(f"{self.name}: No location found for that address.")
+        with trace_span(self.name, "get_coordinates", address) as span:
+            if self.cache is not None:
+                try:
+                    location = self.cache.get(address)
+                except Exception:
+                    # A cache that cannot be read (e.g. a locked database)
+                    # counts as a miss.
+                    location = None
+                span.cache = "hit" if location is not None else "miss"
+                if location is not None:
+                    return location
+
+            try:
+                # Geocoding the address
+                geocode_result = self.flights.do(
+                    ("geocode", normalize_address(address)),
+                    self.rate_limiter.call, "geocode", self.gmaps.geocode, address
+                )
+                
+                if not geocode_result:
+                    # No location found for that address.
+                    span.outcome = "empty"
+                    return None
+                
+                location = geocode_result[0]['geometry']['location']
+                
+            except Exception as e:
+                span.fail(e)
                 return None
-            
-            location = geocode_result[0]['geometry']['location']
-            print(f"{self.name}: Found coordinates: {location['lat']}, {location['lng']}.")
+
+            if self.cache is not None:
+                try:
+                    self.cache.set(address, location)
+                except Exception as e:
+                    # The geocode itself succeeded; only its caching failed.
+                    span.error = f"cache write failed: {type(e).__name__}: {e}"
             return location
+
+    def get_coordinates_batch(self, addresses, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """
+        Geocodes many addresses, calling get_coordinates once per distinct
+        normalized address (see normalize_address) and fanning the result back
+        out to every spelling of it.
+        
+        Args:
+            addresses (list): The street addresses to geocode.
+            max_concurrency (int): Maximum number of geocode calls in flight at once.
             
-        except Exception as e:
-            print(f"An error occurred in LocationAgent: {e}")
-            return None
+        Returns:
+            list: For each address, in input order, a dictionary with 'lat'
+            and 'lng', or None.
+        """
+        keys, unique = dedupe_addresses(addresses)
+        with self._batch_lock:
+            self.batch_addresses += len(keys)
+            self.batch_unique += len(unique)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(unique)))) as executor:
+            located = dict(zip(unique, executor.map(carry(self.get_coordinates), unique.values())))
+        return [dict(located[key]) if located[key] else None for key in keys]
+
+    def dedup_stats(self):
+        """
+        Returns:
+            dict: Addresses passed to get_coordinates_batch, how many distinct
+            ones were geocoded, and the share of geocode calls saved.
+        """
+        with self._batch_lock:
+            total, unique = self.batch_addresses, self.batch_unique
+        return {
+            "addresses": total,
+            "unique": unique,
+            "dedup_ratio": 1 - unique / total if total else 0.0,
+        }
 
 
 class AmenitiesAgent:
@@ -54,8 +162,12 @@ class AmenitiesAgent:
     A specialized agent that finds nearby points of interest using the
     Google Places API.
     """
-    def __init__(self, name="Amenities Agent"):
+    def __init__(self, name="Amenities Agent", cache=None, poi_index=None):
         self.name = name
+        # Optional PlacesCache shared between nearby coordinates.
+        self.cache = cache
+        # Optional offline PoiIndex; categories it holds never hit the network.
+        self.poi_index = poi_index
         # IMPORTANT: This agent uses the same API key as the Location Agent.
         # The key is fetched from the environment variable or the fallback value.
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY", "key")
@@ -63,10 +175,62 @@ class AmenitiesAgent:
         if self.api_key == "YOUR_API_KEY_HERE" or not self.api_key:
             raise ValueError("GOOGLE_MAPS_API_KEY not set. Please paste your key in the code.")
             
-        self.gmaps = googlemaps.Client(key=self.api_key)
-        print(f"{self.name} initialized.")
+        # All agents share one client and its pooled keep-alive connections.
+        # Resolving it here reports an invalid key when the agent is built.
+        self.gmaps = get_gmaps_client(self.api_key)
+        # Shared QPS / adaptive concurrency limits for the Google APIs.
+        self.rate_limiter = default_rate_limiter()
+        # Identical concurrent requests share one upstream call.
+        self.flights = default_single_flight()
+
+    def _search_places(self, location, place_type, radius):
+        """
+        Runs one Places text search and returns the raw results.
+        """
+        # Search for nearby places using the Places API
+        places_result = self.flights.do(
+            ("places", location['lat'], location['lng'], place_type, radius),
+            self.rate_limiter.call, "places", self.gmaps.places,
+            query=place_type,
+            location=location,
+            radius=radius
+        )
+        if not places_result:
+            return []
+        return places_result.get('results', [])
     
-    def find_nearby_places(self, location, place_type, radius=5000):
+    def _search_nearby(self, location, radius):
+        """
+        Runs one Places Nearby Search without a type filter and returns the
+        raw results, whatever their category.
+        """
+        places_result = self.flights.do(
+            ("places_nearby", location['lat'], location['lng'], radius),
+            self.rate_limiter.call, "places", self.gmaps.places_nearby,
+            location=location,
+            radius=radius
+        )
+        if not places_result:
+            return []
+        return places_result.get('results', [])
+
+    def _nearby_results(self, location, place_type, radius, span, exact_radius=False):
+        """
+        Returns the raw text search results for one location, through the
+        Places cache when there is one (see PlacesCache.lookup for
+        `exact_radius`).
+        """
+        if self.cache is None:
+            return self._search_places(location, place_type, radius)
+        span.cache = "hit"
+        
+        def fetch(center, search_radius):
+            span.cache = "miss"
+            return self._search_places(center, place_type, search_radius)
+        
+        return self.cache.lookup(location, place_type, radius, fetch, exact_radius=exact_radius)
+
+    def find_nearby_places(self, location, place_type, radius=5000, top_k=None):
         """
         Finds places of a specific type within a given radius of a location.
         
@@ -74,78 +238,387 @@ class AmenitiesAgent:
             location (dict): A dictionary with 'lat' and 'lng' keys.
             place_type (str): The type of place to search for (e.g., 'school', 'park').
             radius (int): The search radius in meters.
+            top_k (int): Return only the nearest `top_k` places, or None for all.
             
         Returns:
-            list: A list of nearby places with their names and addresses.
+            list: Nearby places with their names, addresses and distance in
+            meters ('distance_m'), nearest first.
         """
-        print(f"\n{self.name}: Received request to find nearby '{place_type}' at {location}.")
-        
-        try:
-            # Search for nearby places using the Places API
-            places_result = self.gmaps.places(
-                query=place_type,
-                location=location,
-                radius=radius
-            )
-            
-            if not places_result or not places_result.get('results'):
-                print(f"{self.name}: No {place_type} found in the area.")
+        with trace_span(self.name, "find_nearby_places", location, place_type, radius) as span:
+            if self.poi_index is not None and self.poi_index.has_category(place_type):
+                span.cache = "index"
+                amenities = self.poi_index.query(location, place_type, radius, top_k)
+                if not amenities:
+                    span.outcome = "empty"
+                return amenities
+
+            try:
+                results = self._nearby_results(location, place_type, radius, span)
+                
+                if not results:
+                    # No places of this type in the area.
+                    span.outcome = "empty"
+                    return []
+                
+                return _rank_places([location], results, top_k=top_k)[0]
+                
+            except Exception as e:
+                span.fail(e)
                 return []
+
+    def find_nearby_places_batch(self, locations, place_type, radius=5000, top_k=None, cluster_precision=None,
+                                 max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """
+        Finds places of a specific type near many locations at once.
+        
+        With an offline POI index that holds `place_type`, all locations are
+        answered by one in-memory query. Otherwise the locations are searched
+        (or served from the cache) and each location is ranked against the
+        results of its own search only, so memory stays linear in the number
+        of locations.
+        
+        With `cluster_precision` set, nearby locations are first grouped by
+        geohash cell (see geoutils.cluster_locations) and each cluster gets a
+        single search from its centroid, widened by the cluster's spread so it
+        still covers `radius` around every member. Upstream calls then scale
+        with the number of clusters rather than locations. A search returns at
+        most one page of results, so very wide clusters see fewer places per
+        member; a precision of 6 keeps clusters to about a kilometer.
+        
+        Args:
+            locations (list): Dictionaries with 'lat' and 'lng' keys.
+            place_type (str): The type of place to search for (e.g., 'school', 'park').
+            radius (int): The search radius in meters.
+            top_k (int): Keep only the nearest `top_k` places per location.
+            cluster_precision (int): Geohash length used to cluster the
+                locations, or None for one search per location.
+            max_concurrency (int): Maximum number of searches in flight at once.
             
-            amenities = []
-            for place in places_result['results']:
-                amenities.append({
-                    "name": place.get('name'),
-                    "address": place.get('vicinity', place.get('formatted_address'))
-                })
+        Returns:
+            list: For each location, in input order, its nearby places nearest first.
+        """
+        with trace_span(self.name, "find_nearby_places_batch", len(locations), place_type, radius) as span:
+            if self.poi_index is not None and self.poi_index.has_category(place_type):
+                span.cache = "index"
+                return self.poi_index.query_batch(locations, place_type, radius, top_k)
+
+            # One search per location, or per cluster for all of its members.
+            if cluster_precision is None:
+                searches = [(location, radius, [i]) for i, location in enumerate(locations)]
+            else:
+                searches = [
+                    (center, min(MAX_SEARCH_RADIUS, radius + spread), members)
+                    for center, spread, members in cluster_locations(locations, cluster_precision)
+                ]
+
+            def search(args):
+                try:
+                    # A cluster's widened radius is searched as is: rounding it
+                    # up to the next cache bucket would spread the single page
+                    # of results over several times the area.
+                    return self._nearby_results(args[0], place_type, args[1], span,
+                                                exact_radius=cluster_precision is not None)
+                except Exception as e:
+                    span.fail(e)
+                    return []
+
+            ranked = [[] for _ in locations]
+            with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(searches)))) as executor:
+                for (_, _, members), results in zip(searches, executor.map(carry(search), searches)):
+                    if not results:
+                        continue
+                    member_places = _rank_places([locations[i] for i in members], results, radius=radius,
+                                                 top_k=top_k)
+                    for i, places in zip(members, member_places):
+                        ranked[i] = places
+            if not any(ranked):
+                span.outcome = "empty"
+            return ranked
+
+    def find_nearby_categories(self, location, categories=AMENITY_TYPES, radius=5000, min_per_category=1,
+                               top_k=None, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """
+        Finds places of several categories with a single Nearby Search.
+        
+        The results are sorted into categories locally using their `types`
+        (see CATEGORY_TYPES) and de-duplicated by place_id. Only a category
+        with fewer than `min_per_category` hits, or one without a types
+        mapping, falls back to its own text search; the fallbacks run
+        concurrently. When the offline POI index holds every category, no
+        search is made at all.
+
+        An untyped Nearby Search returns the ~20 most prominent places of any
+        kind, so a sparse category may get far fewer hits than its own text
+        search would give; raise `min_per_category` to fall back sooner.
+        
+        Args:
+            location (dict): A dictionary with 'lat' and 'lng' keys.
+            categories (iterable): The amenity categories to return.
+            radius (int): The search radius in meters.
+            min_per_category (int): Fewest hits a category needs before the
+                text search fallback is skipped.
+            top_k (int): Keep only the nearest `top_k` places per category.
+            max_concurrency (int): Maximum number of fallback searches in
+                flight at once.
             
-            print(f"{self.name}: Found {len(amenities)} nearby {place_type}(s).")
-            return amenities
+        Returns:
+            dict: The nearby places of each category, nearest first, in input
+            order of the categories.
+        """
+        categories = list(categories)
+        if self.poi_index is not None and all(self.poi_index.has_category(c) for c in categories):
+            return {category: self.find_nearby_places(location, category, radius, top_k) for category in categories}
+        with trace_span(self.name, "find_nearby_categories", location, tuple(categories), radius) as span:
+            try:
+                if self.cache is not None:
+                    span.cache = "hit"
+                    
+                    def fetch(center, search_radius):
+                        span.cache = "miss"
+                        return self._search_nearby(center, search_radius)
+                    
+                    results = self.cache.lookup(location, NEARBY_CACHE_KEY, radius, fetch)
+                else:
+                    results = self._search_nearby(location, radius)
+            except Exception as e:
+                span.fail(e)
+                results = []
+
+            matched = {category: {} for category in categories}
+            for place in results:
+                place_types = set(place.get('types', ()))
+                for category in categories:
+                    if place_types & CATEGORY_TYPES.get(category, set()):
+                        matched[category].setdefault(place.get('place_id') or place.get('name'), place)
+
+            sparse = [category for category in categories if len(matched[category]) < min_per_category]
+            found = {
+                category: _rank_places([location], list(matched[category].values()), top_k=top_k)[0]
+                for category in categories if category not in sparse
+            }
+            if max_concurrency <= 1 or len(sparse) <= 1:
+                for category in sparse:
+                    found[category] = self.find_nearby_places(location, category, radius, top_k)
+            else:
+                with ThreadPoolExecutor(max_workers=min(max_concurrency, len(sparse))) as executor:
+                    futures = {
+                        category: executor.submit(carry(self.find_nearby_places), location, category, radius, top_k)
+                        for category in sparse
+                    }
+                    found.update((category, future.result()) for category, future in futures.items())
+            found = {category: found[category] for category in categories}
+            if not any(found.values()):
+                span.outcome = "empty"
+            return found
+
+    async def iter_nearby_places(self, location, place_type, radius=5000, limit=None):
+        """
+        Streams places of a specific type near a location, one page at a time
+        (see agentplaces.iter_places).
+        
+        Args:
+            location (dict): A dictionary with 'lat' and 'lng' keys.
+            place_type (str): The type of place to search for (e.g., 'school', 'park').
+            radius (int): The search radius in meters.
+            limit (int): Stop after this many places, or None for every page.
             
-        except Exception as e:
-            print(f"An error occurred in AmenitiesAgent: {e}")
-            return []
+        Yields:
+            dict: A nearby place with its name, address and distance in
+                meters ('distance_m'), as find_nearby_places returns them.
+        """
+        async for place in iter_places(self, location, place_type, radius, limit, with_distance=True):
+            yield place
+
+
+def _rank_places(locations, places, radius=None, top_k=None):
+    """
+    Ranks raw Places results by distance from each location with one
+    vectorized distance matrix.
+    
+    Args:
+        locations (list): Dictionaries with 'lat' and 'lng' keys.
+        places (list): Raw Places API results.
+        radius (float): Drop places farther than this many meters, or None.
+        top_k (int): Keep at most this many places per location, or None.
+        
+    Returns:
+        list: For each location, its places as name / address / distance_m
+        dictionaries, nearest first.
+    """
+    points = []
+    for place in places:
+        point = place.get('geometry', {}).get('location') or {}
+        points.append((point.get('lat', float('nan')), point.get('lng', float('nan'))))
+    origins = [(location['lat'], location['lng']) for location in locations]
+    ranked = []
+    for indices, distances in rank_by_distance(origins, points, radius, top_k):
+        ranked.append([
+            {
+                "name": places[i].get('name'),
+                "address": places[i].get('vicinity', places[i].get('formatted_address')),
+                "distance_m": None if math.isnan(d) else round(float(d), 1),
+            }
+            for i, d in zip(indices.tolist(), distances.tolist())
+        ])
+    return ranked
+
+
+# --- Agent Registry ---
+
+def _location_agent():
+    return LocationAgent(cache=default_geocode_cache())
+
+
+def _amenities_agent():
+    return AmenitiesAgent(cache=default_places_cache(), poi_index=default_poi_index())
+
+
+# Long-lived agents, created on first use and shared by every orchestrator
+# call and thread. The factories are module-level functions so an AgentBus can
+# send them to its worker processes.
+AGENTS = AgentRegistry({
+    "location": _location_agent,
+    "amenities": _amenities_agent,
+})
 
 
 # --- A2A Orchestrator ---
 
-def analyze_property(address):
+def fetch_amenities(amenities_agent, coordinates, place_types=AMENITY_TYPES,
+                    max_concurrency=DEFAULT_MAX_CONCURRENCY, multi_category=False):
+    """
+    Runs the amenity lookups for one location concurrently on a thread pool.
+    
+    Args:
+        amenities_agent (AmenitiesAgent): The agent used for the lookups.
+        coordinates (dict): A dictionary with 'lat' and 'lng' keys.
+        place_types (iterable): The place types to search for.
+        max_concurrency (int): Maximum number of lookups in flight at once.
+            A value of 1 runs them one after another.
+        multi_category (bool): Collect every place type with one Nearby Search
+            and classify the results locally instead of one search per type.
+            
+    Returns:
+        dict: The list of nearby places for each place type, in input order.
+    """
+    place_types = list(place_types)
+    if multi_category:
+        return amenities_agent.find_nearby_categories(coordinates, place_types, max_concurrency=max_concurrency)
+    if max_concurrency <= 1 or len(place_types) <= 1:
+        return {
+            place_type: amenities_agent.find_nearby_places(coordinates, place_type)
+            for place_type in place_types
+        }
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(place_types))) as executor:
+        futures = {
+            place_type: executor.submit(carry(amenities_agent.find_nearby_places), coordinates, place_type)
+            for place_type in place_types
+        }
+        return {place_type: future.result() for place_type, future in futures.items()}
+
+
+def build_property_graph(location_agent, amenities_agent, place_types=AMENITY_TYPES, multi_category=False,
+                         max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    Expresses the property analysis as an AgentGraph: geocoding, then every
+    amenity lookup at once (or a single multi-category lookup).
+    
+    Args:
+        location_agent (LocationAgent): Geocodes the 'address' input.
+        amenities_agent (AmenitiesAgent): Looks up the amenities.
+        place_types (iterable): The amenity categories to look up.
+        multi_category (bool): Use one 'amenities' node running
+            find_nearby_categories instead of one node per category.
+        max_concurrency (int): Maximum number of fallback text searches the
+            multi-category node runs at once.
+            
+    Returns:
+        AgentGraph: The graph; its input is 'address'.
+    """
+    graph = AgentGraph("analyze_property", inputs=("address",))
+    graph.add("coordinates", location_agent.get_coordinates, ("address",), share=GEOCODE_SHARE)
+    if multi_category:
+        place_types = list(place_types)
+        graph.add("amenities", lambda coordinates: amenities_agent.find_nearby_categories(
+                      coordinates, place_types, max_concurrency=max_concurrency),
+                  ("coordinates",), fallback={})
+    else:
+        for place_type in place_types:
+            graph.add(place_type, lambda coordinates, place_type=place_type:
+                      amenities_agent.find_nearby_places(coordinates, place_type),
+                      ("coordinates",), fallback=[])
+    return graph
+
+
+def analyze_property(address, max_concurrency=DEFAULT_MAX_CONCURRENCY, agents=AGENTS, multi_category=False,
+                     deadline=DEFAULT_DEADLINE):
     """
     Orchestrates the A2A communication between the location and amenities agents.
+    
+    The agents run as a dependency graph (see build_property_graph) under
+    `deadline`, which every upstream call honours (see deadline.py):
+    geocoding may use GEOCODE_SHARE of it and the amenity lookups the rest.
+    Amenity categories that miss the deadline are listed under 'missing'
+    instead of failing the analysis.
+    
+    Args:
+        address (str): The street address to analyze.
+        max_concurrency (int): Maximum number of amenity lookups in flight at once.
+        agents (AgentRegistry): Where the orchestrator gets its agents from.
+        multi_category (bool): Look the amenities up with one Nearby Search
+            (see AmenitiesAgent.find_nearby_categories) rather than one text
+            search per category. Cheaper, but sparse categories may come back
+            with fewer places.
+        deadline (float): Seconds the analysis may take, or None for no limit.
+        
+    Returns:
+        dict: 'address', 'coordinates', 'amenities' (the places of each
+        category) and 'missing' (categories with no result), or None.
     """
     print("--- Starting Property Analysis ---")
     
     try:
-        # Initialize the agents
-        location_agent = LocationAgent()
-        amenities_agent = AmenitiesAgent()
+        # Get the long-lived agents, initializing them on first use
+        location_agent = agents.get("location")
+        amenities_agent = agents.get("amenities")
     except ValueError as e:
         print(f"Initialization failed: {e}")
-        return
+        return None
 
-    # Step 1: Agent-to-Agent communication (Orchestrator -> Location Agent)
-    # The orchestrator asks the LocationAgent for coordinates.
-    coordinates = location_agent.get_coordinates(address)
+    # Steps 1 and 2: the graph geocodes the address, then hands the
+    # coordinates to every amenity lookup at the same time.
+    graph = build_property_graph(location_agent, amenities_agent, multi_category=multi_category,
+                                 max_concurrency=max_concurrency)
+    result = graph.run_sync({"address": address}, deadline=deadline, max_concurrency=max_concurrency)
     
+    coordinates = result["coordinates"]
     if not coordinates:
-        print("\nCould not find coordinates for the address. Analysis failed.")
-        return
-
-    # Step 2: The orchestrator passes the output of the first agent
-    # to the second agent.
-    nearby_schools = amenities_agent.find_nearby_places(coordinates, "school")
-    nearby_parks = amenities_agent.find_nearby_places(coordinates, "park")
-    nearby_groceries = amenities_agent.find_nearby_places(coordinates, "grocery store")
+        if result.status["coordinates"] == "timeout":
+            print("\nGeocoding missed its deadline. Analysis failed.")
+        else:
+            print("\nCould not find coordinates for the address. Analysis failed.")
+        return None
+
+    if multi_category:
+        amenities = {place_type: result["amenities"].get(place_type, []) for place_type in AMENITY_TYPES}
+        missing = list(AMENITY_TYPES) if "amenities" in result.missing else []
+        reasons = {place_type: result.reason("amenities") for place_type in missing}
+    else:
+        amenities = {place_type: result[place_type] for place_type in AMENITY_TYPES}
+        missing = [name for name in result.missing if name in amenities]
+        reasons = {place_type: result.reason(place_type) for place_type in missing}
     
     # Step 3: Orchestrator processes and presents the final, integrated result.
     print("\n--- Property Analysis Complete ---")
     print(f"Analysis for: {address}")
-    print("\nNearby Schools:")
-    pprint(nearby_schools)
-    print("\nNearby Parks:")
-    pprint(nearby_parks)
-    print("\nNearby Grocery Stores:")
-    pprint(nearby_groceries)
+    for place_type, title in (("school", "Schools"), ("park", "Parks"), ("grocery store", "Grocery Stores")):
+        print(f"\nNearby {title}:")
+        if place_type in missing:
+            print(f"(unavailable: {reasons[place_type]})")
+        else:
+            pprint(amenities[place_type])
+    return {"address": address, "coordinates": coordinates, "amenities": amenities, "missing": missing}
 
 # --- Main Execution ---
 if __name__ == "__main__":
@@ -0,0 +1,290 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from deadline import DeadlineExceeded, carry, expired, remaining
+from ratelimit import is_throttled
+
+# Threads shared by every Hedger for the attempts it runs.
+HEDGE_WORKERS = 64
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hedge_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+        return _executor
+
+
+# --- Hedged Requests ---
+
+# The attempt a hedge-pool thread is running, so Hedger.timed can mark it as
+# having reached the wire.
+_attempt = threading.local()
+
+class Hedger:
+    """
+    Sends a second, identical request when the first one is slower than
+    usual, and returns whichever answers first.
+
+    The hedge goes out once the first attempt has been on the wire for the
+    `quantile` of recent successful wire latencies (p95 by default), so only
+    the slowest few percent of calls cost an extra request. Only the part of
+    an attempt wrapped with `timed` counts: time spent queueing for a rate
+    limiter token or slot is neither timed nor a reason to hedge.
+
+    Args:
+        quantile (float): Latency quantile after which the hedge is sent.
+        window (int): Number of recent latencies the quantile is taken over.
+        min_samples (int): Latencies needed before the quantile is trusted;
+            until then `default_delay` is used.
+        default_delay (float): Hedge delay in seconds while warming up.
+        min_delay (float): Lower bound on the hedge delay in seconds.
+    """
+    def __init__(self, quantile=0.95, window=200, min_samples=20, default_delay=1.0, min_delay=0.05):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """
+        Returns:
+            float: Seconds the first attempt may run before the hedge is sent.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.default_delay
+            ordered = sorted(self._latencies)
+        rank = min(len(ordered) - 1, int(self.quantile * len(ordered)))
+        return max(self.min_delay, ordered[rank])
+
+    def timed(self, func):
+        """
+        Wraps the wire call inside an attempt: its latency feeds the hedge
+        delay, and the hedge timer starts when it is first called.
+
+            hedger.call(limiter.call, "weather", hedger.timed(fetch), location)
+        """
+        def run(*args, **kwargs):
+            on_wire = getattr(_attempt, "on_wire", None)
+            if on_wire is not None:
+                on_wire.set()
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            with self._lock:
+                self._latencies.append(time.perf_counter() - started)
+            return result
+        return run
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls `func(*args, **kwargs)`, hedging it if its wire call (see
+        `timed`) runs long. The attempts run on a shared thread pool under the
+        caller's deadline.
+
+        Returns:
+            The return value of the first attempt that succeeds.
+
+        Raises:
+            The error of the last attempt if every attempt fails, or
+            DeadlineExceeded if the deadline passes first.
+        """
+        executor = _hedge_executor()
+        with self._lock:
+            self.calls += 1
+
+        on_wire = threading.Event()
+        first = executor.submit(carry(self._attempt(func, on_wire)), *args, **kwargs)
+        # Queueing before the wire call is not slowness: start the hedge
+        # timer only once the first attempt is on the wire (or has finished).
+        if not on_wire.wait(remaining()):
+            raise DeadlineExceeded("deadline exceeded before the request was sent")
+        done, _ = wait([first], timeout=self._wait_time(self.delay()))
+        if done:
+            return first.result()
+
+        with self._lock:
+            self.hedged += 1
+        second = executor.submit(carry(self._attempt(func, threading.Event())), *args, **kwargs)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded("deadline exceeded waiting for a hedged request")
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self):
+        """
+        Returns:
+            dict: Calls made, how many were hedged, how often the hedge
+            answered first, and the current hedge delay in milliseconds.
+        """
+        delay = self.delay()
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_ratio": self.hedged / self.calls if self.calls else 0.0,
+                "delay_ms": delay * 1000,
+            }
+
+    @staticmethod
+    def _attempt(func, on_wire):
+        def run(*args, **kwargs):
+            _attempt.on_wire = on_wire
+            try:
+                return func(*args, **kwargs)
+            finally:
+                # Also set when the attempt ends without reaching the wire.
+                on_wire.set()
+                _attempt.on_wire = None
+        return run
+
+    @staticmethod
+    def _wait_time(delay):
+        left = remaining()
+        return delay if left is None else min(delay, left)
+
+
+# --- Circuit Breaker ---
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream service whose circuit is open.
+    """
+
+
+def is_upstream_failure(exc):
+    """
+    Whether an error says the service is unhealthy. Running out of the
+    caller's own deadline (before or during the request) and throttling,
+    which the rate limiter handles, do not.
+    """
+    if isinstance(exc, DeadlineExceeded) or is_throttled(exc):
+        return False
+    return not (isinstance(exc, requests.exceptions.Timeout) and expired())
+
+
+class CircuitBreaker:
+    """
+    Stops calling an unhealthy service. After `failure_threshold` failures in
+    a row the circuit opens and calls fail fast with CircuitOpenError. After
+    `reset_timeout` seconds a single trial call is let through: its success
+    closes the circuit, its failure opens it again. Only errors for which
+    is_upstream_failure holds count as failures.
+
+    Args:
+        name (str): The service, used in error messages.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open before a trial.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns:
+            bool: Whether a call may go upstream now. In the half-open state
+            only one trial call at a time is allowed.
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def rejecting(self):
+        """
+        Returns:
+            bool: Whether the circuit is open and not yet due for a trial, so
+            a call would be rejected. Unlike allow(), this changes nothing.
+        """
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls `func` if the circuit allows it, recording the outcome.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_upstream_failure(e):
+                self.record_failure()
+            else:
+                # Says nothing about the service; let the next trial through.
+                with self._lock:
+                    self._trial_running = False
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
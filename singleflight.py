@@ -0,0 +1,103 @@
+import threading
+
+import deadline
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Whether the leader failed because its own deadline ran out.
+        self.leader_expired = False
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: while a call for a key is running,
+    other callers with the same key wait for it and share its result (or its
+    exception) instead of issuing their own upstream request.
+
+    Each caller waits only until its own deadline. A leader that failed
+    because its deadline ran out does not fail its followers: the first one
+    with time left becomes the new leader and calls again.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Calls `func(*args, **kwargs)` unless a call for `key` is already in
+        flight, in which case it waits for that call instead.
+
+        Args:
+            key (hashable): Identifies calls that are interchangeable.
+            func (callable): The upstream call.
+
+        Returns:
+            The return value of the call that ran for `key`.
+
+        Raises:
+            DeadlineExceeded: If the caller's deadline passes while it waits
+                for another caller's flight.
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                if flight is not None:
+                    self.shared += 1
+                    leader = False
+                else:
+                    flight = _Flight()
+                    self._flights[key] = flight
+                    self.calls += 1
+                    leader = True
+
+            if leader:
+                break
+            if not flight.done.wait(timeout=deadline.remaining()):
+                raise deadline.DeadlineExceeded("deadline exceeded waiting for a shared call")
+            if flight.error is None:
+                return flight.result
+            if not (flight.leader_expired and not deadline.expired()):
+                raise flight.error
+            # The leader only ran out of its own time; call again.
+
+        try:
+            flight.result = func(*args, **kwargs)
+        except Exception as e:
+            flight.error = e
+            flight.leader_expired = isinstance(e, deadline.DeadlineExceeded) or deadline.expired()
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        """
+        Returns:
+            dict: Upstream calls made, calls served by another caller's flight,
+            and the share of calls that were coalesced.
+        """
+        with self._lock:
+            total = self.calls + self.shared
+            return {
+                "calls": self.calls,
+                "shared": self.shared,
+                "coalesced_ratio": self.shared / total if total else 0.0,
+            }
+
+
+_default_single_flight = SingleFlight()
+
+
+def default_single_flight():
+    """
+    Returns the process-wide SingleFlight shared by every agent.
+    """
+    return _default_single_flight
@@ -0,0 +1,209 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+# --- Spans ---
+
+class Span:
+    """
+    One timed agent call.
+
+    Attributes:
+        agent (str): The agent's name, e.g. 'Location Agent'.
+        method (str): The agent method, e.g. 'get_coordinates'.
+        args_hash (str): A short hash of the call arguments.
+        started (float): Wall-clock start time (seconds since the epoch).
+        duration (float): Seconds the call took.
+        outcome (str): 'ok', 'empty' (no results), 'error', 'timeout' or
+            'circuit_open' (rejected by a circuit breaker).
+        cache (str): 'hit', 'miss', 'index' (answered by an offline index),
+            'stale' (last good value served after a failure), or None if no
+            cache was involved.
+        error (str): The error message for failed calls, or for a cache
+            write that failed on an otherwise successful call.
+    """
+    __slots__ = ("agent", "method", "args_hash", "started", "duration", "outcome", "cache", "error")
+
+    def __init__(self, agent, method, args_hash):
+        self.agent = agent
+        self.method = method
+        self.args_hash = args_hash
+        self.started = time.time()
+        self.duration = None
+        self.outcome = "ok"
+        self.cache = None
+        self.error = None
+
+    def fail(self, exc, outcome="error"):
+        """
+        Marks the call as failed with `exc`.
+        """
+        self.outcome = outcome
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _NullSpan:
+    """
+    Stands in for a Span when tracing is off; every update is discarded.
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        pass
+
+    def fail(self, exc, outcome="error"):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _hash_args(args):
+    return hashlib.blake2b(repr(args).encode(), digest_size=8).hexdigest()
+
+
+# --- Exporters ---
+
+class NullExporter:
+    """
+    Drops every span. With this exporter installed spans are not even created.
+    """
+    enabled = False
+
+    def export(self, span):
+        pass
+
+    def close(self):
+        pass
+
+
+class RingBufferExporter:
+    """
+    Keeps the most recent `capacity` spans in memory.
+    """
+    enabled = True
+
+    def __init__(self, capacity=10_000):
+        self._spans = deque(maxlen=capacity)
+
+    def export(self, span):
+        self._spans.append(span)
+
+    def spans(self):
+        """
+        Returns:
+            list: The buffered spans, oldest first.
+        """
+        return list(self._spans)
+
+    def clear(self):
+        self._spans.clear()
+
+    def close(self):
+        pass
+
+
+class JsonLinesExporter:
+    """
+    Appends every span as one JSON object per line to a file.
+    """
+    enabled = True
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def export(self, span):
+        line = json.dumps(span.to_dict())
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def _exporter_from_env():
+    """
+    Builds the exporter named by AGENT_TRACE: unset or 'null' for none,
+    'ring' or 'ring:<capacity>' for an in-memory buffer, 'jsonl:<path>' for a file.
+    """
+    setting = os.getenv("AGENT_TRACE", "null")
+    kind, _, arg = setting.partition(":")
+    if kind == "ring":
+        return RingBufferExporter(int(arg) if arg else 10_000)
+    if kind == "jsonl":
+        return JsonLinesExporter(arg or "agent_trace.jsonl")
+    return NullExporter()
+
+
+_exporter = _exporter_from_env()
+
+
+def set_exporter(exporter):
+    """
+    Installs the exporter every span is sent to, closing the previous one.
+
+    Returns:
+        The installed exporter.
+    """
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not exporter:
+        previous.close()
+    return exporter
+
+
+def get_exporter():
+    return _exporter
+
+
+# --- Instrumentation ---
+
+class trace_span:
+    """
+    Times an agent call and exports it as a Span:
+
+        with trace_span(self.name, "get_coordinates", address) as span:
+            span.cache = "hit"
+
+    Exceptions escaping the block mark the span as an error and propagate.
+    With the NullExporter installed this is a no-op.
+    """
+    __slots__ = ("_span", "_exporter", "_started")
+
+    def __init__(self, agent, method, *args):
+        exporter = _exporter
+        if exporter.enabled:
+            self._exporter = exporter
+            self._span = Span(agent, method, _hash_args(args))
+        else:
+            self._exporter = None
+            self._span = _NULL_SPAN
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._exporter is None:
+            return False
+        span = self._span
+        span.duration = time.perf_counter() - self._started
+        # GeneratorExit only means a streaming caller stopped early.
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            span.fail(exc)
+        self._exporter.export(span)
+        return False
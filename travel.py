@@ -1,8 +1,32 @@
+import asyncio
 import os
-import googlemaps
-import requests
+import threading
+from collections import OrderedDict
 from pprint import pprint
 
+from agentcache import (
+    default_geocode_cache, default_places_cache, default_weather_cache, normalize_address
+)
+from agentgraph import AgentGraph
+from agenthttp import get_gmaps_client, get_session
+from agentplaces import iter_places, place_summary
+from agentregistry import AgentRegistry
+from ratelimit import default_rate_limiter
+from resilience import CircuitBreaker, CircuitOpenError, Hedger
+from singleflight import default_single_flight
+from tracing import trace_span
+
+# Seconds each coordinate-dependent agent call may take in the async orchestrator.
+DEFAULT_CALL_TIMEOUT = 10.0
+
+# Seconds a whole trip plan may take, and the share of it the geocoding step
+# may use; the weather and places lookups get whatever is left.
+DEFAULT_DEADLINE = 15.0
+GEOCODE_SHARE = 0.4
+
+# Last good weather reports kept to serve while wttr.in is unhealthy.
+STALE_WEATHER_ENTRIES = 10_000
+
 # --- Agent Definitions ---
 
 class LocationAgent:
@@ -10,16 +34,23 @@ class LocationAgent:
     A specialized agent that converts a street address or city name to geographical
     coordinates using the Google Maps Geocoding API.
     """
-    def __init__(self, name="Location Agent"):
+    def __init__(self, name="Location Agent", cache=None):
         self.name = name
+        # Optional GeocodeCache consulted before calling the Geocoding API.
+        self.cache = cache
         # Paste your Google Maps API key here
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY", "key")
         
         if self.api_key == "YOUR_GOOGLE_MAPS_API_KEY_HERE" or not self.api_key:
             raise ValueError("GOOGLE_MAPS_API_KEY not set. Please paste your key in the code.")
             
-        self.gmaps = googlemaps.Client(key=self.api_key)
-        print(f"{self.name} initialized.")
+        # All agents share one client and its pooled keep-alive connections.
+        # Resolving it here reports an invalid key when the agent is built.
+        self.gmaps = get_gmaps_client(self.api_key)
+        # Shared QPS / adaptive concurrency limits for the Google APIs.
+        self.rate_limiter = default_rate_limiter()
+        # Identical concurrent requests share one upstream call.
+        self.flights = default_single_flight()
 
     def get_coordinates(self, address):
         """
@@ -31,21 +62,43 @@ class LocationAgent:
         Returns:
             dict: A dictionary with 'lat' and 'lng' of the location, or None.
         """
-        print(f"\n{self.name}: Received request to geocode location: '{address}'.")
-        try:
-            geocode_result = self.gmaps.geocode(address)
-            
-            if not geocode_result:
-                print(f"{self.name}: No location found for that address.")
+        with trace_span(self.name, "get_coordinates", address) as span:
+            if self.cache is not None:
+                try:
+                    location = self.cache.get(address)
+                except Exception:
+                    # A cache that cannot be read (e.g. a locked database)
+                    # counts as a miss.
+                    location = None
+                span.cache = "hit" if location is not None else "miss"
+                if location is not None:
+                    return location
+
+            try:
+                # Geocoding the address
+                geocode_result = self.flights.do(
+                    ("geocode", normalize_address(address)),
+                    self.rate_limiter.call, "geocode", self.gmaps.geocode, address
+                )
+                
+                if not geocode_result:
+                    # No location found for that address.
+                    span.outcome = "empty"
+                    return None
+                
+                location = geocode_result[0]['geometry']['location']
+                
+            except Exception as e:
+                span.fail(e)
                 return None
-            
-            location = geocode_result[0]['geometry']['location']
-            print(f"{self.name}: Found coordinates: {location['lat']}, {location['lng']}.")
+
+            if self.cache is not None:
+                try:
+                    self.cache.set(address, location)
+                except Exception as e:
+                    # The geocode itself succeeded; only its caching failed.
+                    span.error = f"cache write failed: {type(e).__name__}: {e}"
             return location
-            
-        except Exception as e:
-            print(f"An error occurred in LocationAgent: {e}")
-            return None
 
 
 class AttractionsAgent:
@@ -53,16 +106,38 @@ class AttractionsAgent:
     A specialized agent that finds nearby points of interest for a traveler
     using the Google Places API.
     """
-    def __init__(self, name="Attractions Agent"):
+    def __init__(self, name="Attractions Agent", cache=None):
         self.name = name
+        # Optional PlacesCache shared between nearby coordinates.
+        self.cache = cache
         # This agent uses the same Google Maps API key as the Location Agent.
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY", "key")
         
         if self.api_key == "YOUR_GOOGLE_MAPS_API_KEY_HERE" or not self.api_key:
             raise ValueError("GOOGLE_MAPS_API_KEY not set. Please paste your key in the code.")
             
-        self.gmaps = googlemaps.Client(key=self.api_key)
-        print(f"{self.name} initialized.")
+        # All agents share one client and its pooled keep-alive connections.
+        # Resolving it here reports an invalid key when the agent is built.
+        self.gmaps = get_gmaps_client(self.api_key)
+        # Shared QPS / adaptive concurrency limits for the Google APIs.
+        self.rate_limiter = default_rate_limiter()
+        # Identical concurrent requests share one upstream call.
+        self.flights = default_single_flight()
+
+    def _search_places(self, location, place_type, radius):
+        """
+        Runs one Places text search and returns the raw results.
+        """
+        places_result = self.flights.do(
+            ("places", location['lat'], location['lng'], place_type, radius),
+            self.rate_limiter.call, "places", self.gmaps.places,
+            query=place_type,
+            location=location,
+            radius=radius
+        )
+        if not places_result:
+            return []
+        return places_result.get('results', [])
     
     def find_nearby_places(self, location, place_type, radius=5000):
         """
@@ -76,43 +151,100 @@ class AttractionsAgent:
         Returns:
             list: A list of nearby places with their names and addresses.
         """
-        print(f"\n{self.name}: Received request to find nearby '{place_type}' at {location}.")
-        
-        try:
-            places_result = self.gmaps.places(
-                query=place_type,
-                location=location,
-                radius=radius
-            )
-            
-            if not places_result or not places_result.get('results'):
-                print(f"{self.name}: No {place_type} found in the area.")
+        with trace_span(self.name, "find_nearby_places", location, place_type, radius) as span:
+            try:
+                if self.cache is not None:
+                    span.cache = "hit"
+                    
+                    def fetch(center, search_radius):
+                        span.cache = "miss"
+                        return self._search_places(center, place_type, search_radius)
+                    
+                    results = self.cache.lookup(location, place_type, radius, fetch)
+                else:
+                    results = self._search_places(location, place_type, radius)
+                
+                if not results:
+                    # No places of this type in the area.
+                    span.outcome = "empty"
+                    return []
+                
+                return [place_summary(place) for place in results]
+                
+            except Exception as e:
+                span.fail(e)
                 return []
+
+    async def iter_nearby_places(self, location, place_type, radius=5000, limit=None):
+        """
+        Streams places of a specific type near a location, one page at a time
+        (see agentplaces.iter_places).
+        
+        Args:
+            location (dict): A dictionary with 'lat' and 'lng' keys.
+            place_type (str): The type of place to search for (e.g., 'museum', 'restaurant').
+            radius (int): The search radius in meters.
+            limit (int): Stop after this many places, or None for every page.
             
-            amenities = []
-            for place in places_result['results']:
-                amenities.append({
-                    "name": place.get('name'),
-                    "address": place.get('vicinity', place.get('formatted_address'))
-                })
-            
-            print(f"{self.name}: Found {len(amenities)} nearby {place_type}(s).")
-            return amenities
-            
-        except Exception as e:
-            print(f"An error occurred in AttractionsAgent: {e}")
-            return []
+        Yields:
+            dict: A nearby place with its name and address, as
+                find_nearby_places returns them.
+        """
+        async for place in iter_places(self, location, place_type, radius, limit, with_distance=False):
+            yield place
 
 
 class WeatherAgent:
     """
     A specialized agent that gets the weather forecast for a given location
     using the free wttr.in service.
+    
+    wttr.in has a heavy latency tail, so requests are hedged (see
+    resilience.Hedger) and guarded by a circuit breaker. While the circuit is
+    open, or when a fetch fails, the last good report for the location is
+    served instead, marked with 'stale': True.
     """
-    def __init__(self, name="Weather Agent"):
+    def __init__(self, name="Weather Agent", cache=None, hedge=True, breaker=None):
         self.name = name
-        self.base_url = "https://wttr.in/"
-        print(f"{self.name} initialized.")
+        # Optional WeatherCache keyed by coordinates rounded to a grid.
+        self.cache = cache
+        # Override with WTTR_BASE_URL to use a local stand-in (see fakemaps.py).
+        self.base_url = os.getenv("WTTR_BASE_URL", "https://wttr.in/")
+        # wttr.in is rate limited too; it shares the process-wide limiter.
+        self.rate_limiter = default_rate_limiter()
+        # Identical concurrent requests share one upstream call.
+        self.flights = default_single_flight()
+        # Sends a second request when the first is slower than the recent p95.
+        self.hedger = Hedger() if hedge else None
+        # Fails fast while wttr.in keeps failing.
+        self.breaker = breaker or CircuitBreaker("wttr.in")
+        # (lat, lng) -> last good report, served when wttr.in is unhealthy.
+        self._last_good = OrderedDict()
+        self._last_good_lock = threading.Lock()
+    
+    def _fetch_weather(self, location):
+        """
+        Fetches the raw j1 weather document for a location.
+        """
+        # We'll use the latitude and longitude to get the weather forecast in JSON format
+        response = get_session().get(f"{self.base_url}{location['lat']},{location['lng']}?format=j1")
+        response.raise_for_status() # Raise an exception for bad status codes
+        return response.json()
+
+    def _request_weather(self, location):
+        """
+        One rate-limited fetch, hedged when a Hedger is configured. The
+        circuit breaker sits inside the limiter, so time spent queueing for a
+        slot never counts against wttr.in, and the hedger only times the
+        fetch itself, so it does not feed the hedge delay either.
+        """
+        if self.breaker.rejecting():
+            # Fail fast instead of queueing for a slot first.
+            raise CircuitOpenError(f"{self.breaker.name} circuit is open")
+        if self.hedger is None:
+            return self.rate_limiter.call("weather", self.breaker.call, self._fetch_weather, location)
+        return self.hedger.call(self.rate_limiter.call, "weather", self.breaker.call,
+                                self.hedger.timed(self._fetch_weather), location)
         
     def get_weather(self, location):
         """
@@ -122,79 +254,232 @@ class WeatherAgent:
             location (dict): A dictionary with 'lat' and 'lng' keys.
             
         Returns:
-            dict: The weather data, or None.
+            dict: The weather data, the last good (stale) data if wttr.in is
+            unavailable, or None.
         """
-        print(f"\n{self.name}: Received request for weather at {location['lat']}, {location['lng']}.")
-        try:
-            # We'll use the latitude and longitude to get the weather forecast in JSON format
-            response = requests.get(f"{self.base_url}{location['lat']},{location['lng']}?format=j1")
-            response.raise_for_status() # Raise an exception for bad status codes
-            
-            weather_data = response.json()
-            current_condition = weather_data['current_condition'][0]
-            
-            weather_report = {
-                "description": current_condition['weatherDesc'][0]['value'],
-                "temperature": f"{current_condition['temp_C']} °C",
-                "feels_like": f"{current_condition['FeelsLikeC']} °C",
-                "humidity": f"{current_condition['humidity']}%",
-                "wind_speed": f"{current_condition['windspeedKmph']} km/h"
-            }
-            print(f"{self.name}: Successfully retrieved weather data.")
-            return weather_report
-            
-        except Exception as e:
-            print(f"An error occurred in WeatherAgent: {e}")
-            return None
+        with trace_span(self.name, "get_weather", location) as span:
+            try:
+                if self.cache is not None:
+                    span.cache = "hit"
+                    
+                    def fetch(grid_point):
+                        span.cache = "miss"
+                        return self._get_weather_report(grid_point)
+                    
+                    return self.cache.lookup(location, fetch)
+                return self._get_weather_report(location)
+                
+            except Exception as e:
+                span.fail(e, "circuit_open" if isinstance(e, CircuitOpenError) else "error")
+                stale = self._stale_report(location)
+                if stale is not None:
+                    span.cache = "stale"
+                return stale
+
+    def _stale_report(self, location):
+        """
+        Returns the last good report for the location's cache grid cell (or
+        exact coordinates without a cache), marked as stale, or None.
+        """
+        point = self.cache.grid_point(location)[1] if self.cache is not None else location
+        with self._last_good_lock:
+            report = self._last_good.get((point['lat'], point['lng']))
+        return None if report is None else dict(report, stale=True)
+
+    def _remember(self, location, report):
+        with self._last_good_lock:
+            key = (location['lat'], location['lng'])
+            self._last_good[key] = report
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > STALE_WEATHER_ENTRIES:
+                self._last_good.popitem(last=False)
+
+    def _get_weather_report(self, location):
+        """
+        Fetches the weather for a location and extracts the current conditions.
+        """
+        weather_data = self.flights.do(
+            ("weather", location['lat'], location['lng']),
+            self._request_weather, location
+        )
+        current_condition = weather_data['current_condition'][0]
+        
+        report = {
+            "description": current_condition['weatherDesc'][0]['value'],
+            "temperature": f"{current_condition['temp_C']} °C",
+            "feels_like": f"{current_condition['FeelsLikeC']} °C",
+            "humidity": f"{current_condition['humidity']}%",
+            "wind_speed": f"{current_condition['windspeedKmph']} km/h"
+        }
+        self._remember(location, report)
+        return report
+
+
+# --- Agent Registry ---
+
+def _location_agent():
+    return LocationAgent(cache=default_geocode_cache())
+
+
+def _attractions_agent():
+    return AttractionsAgent(cache=default_places_cache())
+
+
+def _weather_agent():
+    return WeatherAgent(cache=default_weather_cache())
+
+
+# Long-lived agents, created on first use and shared by every orchestrator
+# call and thread. The factories are module-level functions so an AgentBus can
+# send them to its worker processes.
+AGENTS = AgentRegistry({
+    "location": _location_agent,
+    "attractions": _attractions_agent,
+    "weather": _weather_agent,
+})
 
 
 # --- A2A Orchestrator ---
 
-def plan_trip(city):
+def _init_agents(agents):
     """
-    Orchestrates the A2A communication between multiple agents to create a
-    comprehensive travel plan.
-    """
-    print(f"--- Starting Trip Plan for {city} ---")
+    Gets the agents used by the orchestrators, initializing them on first use.
     
+    Returns:
+        tuple: (LocationAgent, AttractionsAgent, WeatherAgent), or None if
+        initialization failed.
+    """
     try:
-        # Initialize the agents
-        location_agent = LocationAgent()
-        attractions_agent = AttractionsAgent()
-        weather_agent = WeatherAgent()
+        return agents.get("location"), agents.get("attractions"), agents.get("weather")
     except ValueError as e:
         print(f"Initialization failed: {e}")
-        return
+        return None
+
 
-    # Step 1: Orchestrator -> Location Agent
-    # The orchestrator asks the LocationAgent for coordinates.
-    coordinates = location_agent.get_coordinates(city)
+def _present_trip_plan(city, trip_plan, reasons):
+    """
+    Prints the integrated result of a trip plan, marking the sections that
+    are missing and why (`reasons`, by section).
+    """
+    print(f"\n--- Trip Plan for {city} Complete ---")
+    for section, title in (("weather", "Weather Forecast"), ("attractions", "Nearby Attractions"),
+                           ("restaurants", "Nearby Restaurants")):
+        print(f"\n{title}:")
+        if section in trip_plan["missing"]:
+            print(f"(unavailable: {reasons[section]})")
+        else:
+            pprint(trip_plan[section])
+
+
+def build_trip_graph(location_agent, attractions_agent, weather_agent, call_timeout=None):
+    """
+    Expresses the trip plan as an AgentGraph: geocoding, then the weather and
+    both places lookups at the same time.
     
-    if not coordinates:
-        print("\nCould not find coordinates for the city. Planning failed.")
-        return
-
-    # Step 2: Orchestrator passes the output of the first agent to the others.
-    # It communicates with the WeatherAgent and AttractionsAgent in parallel.
-    weather_data = weather_agent.get_weather(coordinates)
-    nearby_attractions = attractions_agent.find_nearby_places(coordinates, "tourist_attraction")
-    nearby_restaurants = attractions_agent.find_nearby_places(coordinates, "restaurant")
+    Args:
+        location_agent (LocationAgent): Geocodes the 'city' input.
+        attractions_agent (AttractionsAgent): Looks up attractions and restaurants.
+        weather_agent (WeatherAgent): Gets the weather.
+        call_timeout (float): Seconds allowed for each agent call, or None.
+        
+    Returns:
+        AgentGraph: The graph; its input is 'city'.
+    """
+    graph = AgentGraph("plan_trip", inputs=("city",))
+    graph.add("coordinates", location_agent.get_coordinates, ("city",),
+              timeout=call_timeout, share=GEOCODE_SHARE)
+    graph.add("weather", weather_agent.get_weather, ("coordinates",), timeout=call_timeout)
+    graph.add("attractions", lambda coordinates: attractions_agent.find_nearby_places(coordinates, "tourist_attraction"),
+              ("coordinates",), timeout=call_timeout, fallback=[])
+    graph.add("restaurants", lambda coordinates: attractions_agent.find_nearby_places(coordinates, "restaurant"),
+              ("coordinates",), timeout=call_timeout, fallback=[])
+    return graph
+
+
+def _trip_plan(city, result):
+    """
+    Builds (and presents) the trip plan from a finished graph run.
+    """
+    if not result["coordinates"]:
+        if result.status["coordinates"] == "timeout":
+            print("\nGeocoding missed its deadline. Planning failed.")
+        else:
+            print("\nCould not find coordinates for the city. Planning failed.")
+        return None
+
+    trip_plan = {section: result[section] for section in ("weather", "attractions", "restaurants")}
+    trip_plan["missing"] = [name for name in result.missing if name in trip_plan]
     
     # Step 3: Orchestrator processes and presents the final, integrated result.
-    print(f"\n--- Trip Plan for {city} Complete ---")
-    print("\nWeather Forecast:")
-    pprint(weather_data)
+    _present_trip_plan(city, trip_plan, {name: result.reason(name) for name in trip_plan["missing"]})
+    return trip_plan
+
+
+def plan_trip(city, agents=AGENTS, deadline=DEFAULT_DEADLINE):
+    """
+    Orchestrates the A2A communication between multiple agents to create a
+    comprehensive travel plan.
+    
+    The agents run as a dependency graph (see build_trip_graph) under
+    `deadline`, which every upstream call honours (see deadline.py):
+    geocoding may use GEOCODE_SHARE of it and the other calls the rest.
+    Sections that miss it are listed under 'missing'.
     
-    print("\nNearby Attractions:")
-    pprint(nearby_attractions)
+    Args:
+        city (str): The city to plan a trip for.
+        agents (AgentRegistry): Where the orchestrator gets its agents from.
+        deadline (float): Seconds the plan may take, or None for no limit.
+        
+    Returns:
+        dict: The trip plan with 'weather', 'attractions', 'restaurants' and
+        'missing', or None.
+    """
+    print(f"--- Starting Trip Plan for {city} ---")
     
-    print("\nNearby Restaurants:")
-    pprint(nearby_restaurants)
+    initialized = _init_agents(agents)
+    if initialized is None:
+        return None
+
+    # Steps 1 and 2: the graph geocodes the city, then hands the coordinates
+    # to the weather and places lookups at the same time.
+    result = build_trip_graph(*initialized).run_sync({"city": city}, deadline=deadline)
+    return _trip_plan(city, result)
+
+
+async def plan_trip_async(city, call_timeout=DEFAULT_CALL_TIMEOUT, agents=AGENTS, deadline=DEFAULT_DEADLINE):
+    """
+    Async version of plan_trip for callers already on an event loop. Every
+    agent call is also bounded by call_timeout.
+    
+    A call that misses its time contributes the same value the agent returns
+    on failure (None for weather, an empty list for places) and is listed
+    under 'missing', so the trip plan has the same shape as the one returned
+    by plan_trip.
+    
+    Args:
+        city (str): The city to plan a trip for.
+        call_timeout (float): Seconds allowed for each agent call.
+        agents (AgentRegistry): Where the orchestrator gets its agents from.
+        deadline (float): Seconds the plan may take, or None for no limit.
+        
+    Returns:
+        dict: The trip plan with 'weather', 'attractions', 'restaurants' and
+        'missing', or None.
+    """
+    print(f"--- Starting Trip Plan for {city} ---")
+    
+    initialized = _init_agents(agents)
+    if initialized is None:
+        return None
+
+    graph = build_trip_graph(*initialized, call_timeout=call_timeout)
+    result = await graph.run({"city": city}, deadline=deadline)
+    return _trip_plan(city, result)
 
 # --- Main Execution ---
 if __name__ == "__main__":
     # To run this, you need to paste your Google Maps API key in the code above.
     user_input = input("enter the city you esnt to go:").strip()
-    plan_trip(user_input)
+    asyncio.run(plan_trip_async(user_input))
     
    